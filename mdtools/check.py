@@ -477,7 +477,11 @@ def dtrj(dtrj, shape=None, amin=None, amax=None, dtype=None):
     elif dtrj.ndim > 2:
         raise ValueError("'dtrj' has {} dimensions but must have one or"
                          " two dimensions".format(dtrj.ndim))
-    if np.any(np.modf(dtrj)[0] != 0):
+    # Arrays of integer type cannot contain non-integer elements.
+    # Checking this explicitly would require to read the entire array,
+    # which is particularly expensive for memory-mapped arrays.
+    if (dtrj.dtype.kind not in ('i', 'u') and
+            np.any(np.modf(dtrj)[0] != 0)):
         raise ValueError("At least one element of 'dtrj' is not an"
                          " integer")
     if (shape is not None or
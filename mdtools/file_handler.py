@@ -29,6 +29,10 @@ This module can be called from :mod:`mdtools` via the shortcut ``fh``::
 
 # Standard libraries
 import os
+import re
+import gzip
+import stat
+import functools
 import warnings
 from datetime import datetime
 # Third party libraries
@@ -37,6 +41,28 @@ import numpy as np
 import mdtools as mdt
 
 
+# Printf-style format specifier for a single real number, like the
+# default format '%16.9e' of :func:`mdtools.file_handler.savetxt`.
+_REAL_FMT = re.compile(r"%[-+ #0]*[0-9]*(\.[0-9]*)?[eEfFgG]")
+
+# Template for the time-independent part of the header string created
+# by :func:`mdtools.file_handler.header_str`.
+_HEADER_STATIC_TEMPLATE = ("\n"
+                           "{copyright_notice}\n"
+                           "\n"
+                           "\n"
+                           "Command line input:\n"
+                           "  {command_line}\n"
+                           "Working directory:\n"
+                           "  {cwd}\n"
+                           "Executable:\n"
+                           "  {exe}\n"
+                           "mdtools version:\n"
+                           "  {version}\n"
+                           "Python version:\n"
+                           "  {pversion}\n")
+
+
 def cd_up(n, path=__file__):
     """
     Move `n` steps upwards in the directory tree.
@@ -66,7 +92,12 @@ def backup(fname):
     
     Check if a file with name `fname` already exists.  If so, rename it
     to ``'fname.bak_timestamp'``, where ``'timestamp'`` is the time when
-    the renaming was done in YYYY-MM-DD_HH-MM-SS format.
+    the renaming was done in YYYY-MM-DD_HH-MM-SS format.  Only regular
+    files (or symbolic links to regular files) are renamed.
+    Directories, FIFOs, sockets, device nodes and dangling symbolic
+    links are left untouched.  If a backup with the same name already exists,
+    because `fname` was already backed up within the same second, it is
+    silently overwritten on all platforms (see :func:`os.replace`).
     
     Parameters
     ----------
@@ -77,18 +108,23 @@ def backup(fname):
     -------
     renamed : bool
         Returns ``True`` if a file called `fname` already existed and
-        was renamed.  ``False`` if no file called `fname` exists and no
-        backup was done.
+        was renamed.  ``False`` if no regular file called `fname`
+        exists and no backup was done.
     """
-    if os.path.isfile(fname):
-        timestamp = datetime.now()
-        backup_name = (fname + ".bak_" +
-                       str(timestamp.strftime('%Y-%m-%d_%H-%M-%S')))
-        os.rename(fname, backup_name)
-        print("Backuped {} to {}".format(fname, backup_name))
-        return True
-    else:
+    # A single os.stat call both checks the existence of `fname` and
+    # tells whether it is a regular file, like os.path.isfile.
+    try:
+        if not stat.S_ISREG(os.stat(fname).st_mode):
+            return False
+    except (FileNotFoundError, NotADirectoryError):
         return False
+    backup_name = (fname + ".bak_" +
+                   datetime.now().strftime('%Y-%m-%d_%H-%M-%S'))
+    # In contrast to os.rename, os.replace does not raise an exception
+    # on Windows if a backup with the same name already exists.
+    os.replace(fname, backup_name)
+    print("Backuped {} to {}".format(fname, backup_name))
+    return True
 
 
 def indent(text, amount, char=" "):
@@ -96,8 +132,9 @@ def indent(text, amount, char=" "):
     Indent a text by a given amount.
     
     Pad every line of `text` with as many instances of `char` as given
-    by `amount`.  Lines in `text` are identified by Python's string
-    method :meth:`str.splitlines`.
+    by `amount`.  Lines in `text` are identified by the newline
+    character ``'\n'``.  A trailing newline character does not start a
+    new line.
     
     Parameters
     ----------
@@ -129,8 +166,18 @@ def indent(text, amount, char=" "):
     #   It's me, Mario!
     """
     padding = amount * char
-    return ''.join(padding + line
-                   for line in text.splitlines(keepends=True))
+    if not padding or not text:
+        return text
+    # str.replace runs entirely in C and is much faster than iterating
+    # over the lines in Python.
+    if text.endswith('\n'):
+        # Do not pad the empty "line" after a trailing newline.  Limit
+        # the number of replacements instead of slicing the result,
+        # which would create another copy of the entire text.
+        return padding + text.replace('\n', '\n' + padding,
+                                      text.count('\n') - 1)
+    else:
+        return padding + text.replace('\n', '\n' + padding)
 
 
 def header_str():
@@ -159,28 +206,50 @@ def header_str():
         Generate some run time information
     :func:`mdtools.run_time_info.run_time_info_str` :
         Create a string containing some run time information
+    
+    Notes
+    -----
+    Only the creation date is determined anew each time this function
+    is called.  The remaining content is generated at the first call
+    and cached afterwards.
     """
-    timestamp = datetime.now()
-    script, command_line, cwd, exe, version, pversion = mdt.rti.run_time_info()
+    script, static_header = _header_static()
     header = ("Created by {} on {}\n"
-              .format(script, timestamp.strftime('%Y/%m/%d %H:%M')))
-    header += "\n"
-    header += mdt.__copyright_notice__ + "\n"
-    header += "\n"
-    header += "\n"
-    header += "Command line input:\n"
-    header += "  {}\n".format(command_line)
-    header += "Working directory:\n"
-    header += "  {}\n".format(cwd)
-    header += "Executable:\n"
-    header += "  {}\n".format(exe)
-    header += "mdtools version:\n"
-    header += "  {}\n".format(version)
-    header += "Python version:\n"
-    header += "  {}\n".format(pversion)
+              .format(script, datetime.now().strftime('%Y/%m/%d %H:%M')))
+    header += static_header
     return header
 
 
+@functools.lru_cache(maxsize=1)
+def _header_static():
+    """
+    Create the time-independent part of the standard header string.
+    
+    The run time information does not change during the lifetime of a
+    process.  Hence, the string is only created once and cached for
+    subsequent calls.
+    
+    Returns
+    -------
+    script : str
+        The name of the executed script.
+    static_header : str
+        The part of the header string returned by
+        :func:`mdtools.file_handler.header_str` that follows the line
+        containing the creation date.
+    """
+    script, command_line, cwd, exe, version, pversion = mdt.rti.run_time_info()
+    header = _HEADER_STATIC_TEMPLATE.format(
+        copyright_notice=mdt.__copyright_notice__,
+        command_line=command_line,
+        cwd=cwd,
+        exe=exe,
+        version=version,
+        pversion=pversion
+    )
+    return script, header
+
+
 def write_header(fname, rename=True):
     """
     Create a file and write the standard MDTools header to it.
@@ -205,8 +274,20 @@ def write_header(fname, rename=True):
     """
     if rename:
         backup(fname)
-    with open(fname, 'w') as outfile:
-        outfile.write(indent(text=header_str(), amount=1, char="# "))
+    # Write the header with low-level system calls.  This avoids
+    # creating the buffered text I/O layer of :func:`open` for writing
+    # just one string.  os.write may write less than requested (e.g. if
+    # interrupted by a signal or on network file systems), so write
+    # until all data are written.
+    data = memoryview(
+        indent(text=header_str(), amount=1, char="# ").encode()
+    )
+    fd = os.open(fname, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+    try:
+        while data:
+            data = data[os.write(fd, data):]
+    finally:
+        os.close(fd)
 
 
 def savetxt(  # TODO: Replace arguments by *args, **kwargs
@@ -238,7 +319,8 @@ def savetxt(  # TODO: Replace arguments by *args, **kwargs
         to mark them as comments.
     encoding : {None, str}, optional
         Encoding used to encode the outputfile.  Does not apply to
-        output streams.  See documentation of :func:`numpy.savetxt`.
+        output streams.  Default: ``'latin1'``, like
+        :func:`numpy.savetxt`.
     rename : bool, optional
         If ``True`` and a file called `fname` already exists, rename it
         to ``'fname.bak_timestamp'``.  See
@@ -255,8 +337,13 @@ def savetxt(  # TODO: Replace arguments by *args, **kwargs
     
     Notes
     -----
-    This function simply calls :func:`numpy.savetxt` and adds a
-    MDTools specific header to the output file.  See
+    This function writes a MDTools specific header to the output file
+    and then writes the data.  If `fmt` is a single format specifier
+    for real numbers and `data` is a 1- or 2-dimensional array of real
+    numbers, the data are formatted in chunks of many rows at once,
+    which is considerably faster than :func:`numpy.savetxt`.  The
+    output is the same as with :func:`numpy.savetxt`.  In all other
+    cases, :func:`numpy.savetxt` is called to write the data.  See
     :func:`mdtools.file_handler.header_str` for further information
     about what is included in the header.
     """
@@ -265,15 +352,77 @@ def savetxt(  # TODO: Replace arguments by *args, **kwargs
         head += "\n\n" + header
     if rename:
         backup(fname)
-    np.savetxt(fname=fname,
-               X=data,
-               fmt=fmt,
-               delimiter=delimiter,
-               newline=newline,
-               header=head,
-               footer=footer,
-               comments=comments,
-               encoding=encoding)
+    if encoding is None:
+        # Default encoding of numpy.savetxt.
+        encoding = 'latin1'
+    # Like numpy.savetxt, transparently compress files ending on '.gz'.
+    if fname.endswith('.gz'):
+        outfile = gzip.open(fname, 'wt', encoding=encoding)
+    else:
+        outfile = open(fname, 'w', encoding=encoding)
+    with outfile:
+        # Write the header directly instead of letting numpy.savetxt
+        # reformat it.  The result is the same as with
+        # ``numpy.savetxt(..., header=head)``.
+        outfile.write(comments + head.replace('\n', '\n' + comments) +
+                      newline)
+        data = np.asarray(data)
+        if (isinstance(fmt, str) and _REAL_FMT.fullmatch(fmt) and
+                '%' not in delimiter + newline and
+                data.dtype.kind in ('f', 'i', 'u') and
+                1 <= data.ndim <= 2):
+            # Fast path for the common case of a single format
+            # specifier for real numbers.
+            if data.ndim == 1:
+                data = data.reshape(-1, 1)
+            row_fmt = delimiter.join([fmt] * data.shape[1]) + newline
+            _write_rows(outfile, data, row_fmt)
+            if footer is not None and footer != '':
+                outfile.write(comments +
+                              footer.replace('\n', '\n' + comments) +
+                              newline)
+        else:
+            np.savetxt(fname=outfile,
+                       X=data,
+                       fmt=fmt,
+                       delimiter=delimiter,
+                       newline=newline,
+                       header='',
+                       footer=footer,
+                       comments=comments,
+                       encoding=encoding)
+
+
+def _write_rows(outfile, data, row_fmt, chunkelems=2**16):
+    """
+    Write a 2-dimensional array row by row to an open text file.
+    
+    Instead of formatting each row separately (like
+    :func:`numpy.savetxt` does), many rows are formatted at once by
+    applying a repeated row format to a flat tuple of Python numbers.
+    This considerably reduces the interpreter overhead for arrays with
+    many rows but only few columns.
+    
+    Parameters
+    ----------
+    outfile : file object
+        The file to write to.  Must be opened in text mode.
+    data : numpy.ndarray
+        2-dimensional array of real numbers.
+    row_fmt : str
+        Printf-style format string for one row of `data` including the
+        newline character(s).  Must contain exactly one format
+        specifier per column of `data`.
+    chunkelems : int, optional
+        Maximum number of array elements to format at once.  The rows
+        are written in chunks of ``max(1, chunkelems // n_columns)``
+        rows, which bounds the size of the temporary tuple and string
+        independently of the number of columns.
+    """
+    chunksize = max(1, chunkelems // max(1, data.shape[1]))
+    for start in range(0, len(data), chunksize):
+        chunk = data[start:start+chunksize]
+        outfile.write((row_fmt * len(chunk)) % tuple(chunk.ravel().tolist()))
 
 
 def savetxt_matrix(  # TODO: Replace arguments by *args, **kwargs
@@ -354,21 +503,63 @@ def savetxt_matrix(  # TODO: Replace arguments by *args, **kwargs
     -----
     Internally, this function calls :func:`mdtools.file_handler.savetxt`.
     """
+    matrix = _prepare_matrix(data=data,
+                             var1=var1,
+                             var2=var2,
+                             init_values1=init_values1,
+                             init_values2=init_values2,
+                             upper_left=upper_left)
+    savetxt(fname=fname,
+            data=matrix,
+            fmt=fmt,
+            delimiter=delimiter,
+            newline=newline,
+            header=header,
+            footer=footer,
+            comments=comments,
+            encoding=encoding,
+            rename=rename)
+
+
+def _prepare_matrix(data, var1, var2, init_values1=None,
+                    init_values2=None, upper_left=0):
+    """
+    Check the input of :func:`mdtools.file_handler.savetxt_matrix` and
+    :func:`mdtools.file_handler.write_matrix_block` and assemble the
+    final data matrix.
+    
+    Parameters
+    ----------
+    data, var1, var2, init_values1, init_values2, upper_left :
+        See :func:`mdtools.file_handler.savetxt_matrix`.
+    
+    Returns
+    -------
+    matrix : numpy.ndarray
+        Array of shape ``(n+1, m+1)``.  The first row contains
+        `upper_left` followed by the values of `var2`, the first column
+        contains `upper_left` followed by the values of `var1`.  The
+        remaining elements are taken from `data` and, if supplied, from
+        `init_values1` (second row) and `init_values2` (second column).
+    """
     var1 = np.asarray(var1)
     var2 = np.asarray(var2)
+    data = np.asarray(data)
     mdt.check.array(var1, dim=1)
     mdt.check.array(var2, dim=1)
     if init_values1 is None and init_values2 is None:
         mdt.check.array(data, shape=(len(var1), len(var2)))
     elif init_values1 is not None and init_values2 is None:
+        init_values1 = np.asarray(init_values1)
         mdt.check.array(init_values1, shape=var2.shape)
         mdt.check.array(data, shape=(len(var1)-1, len(var2)))
-        data = np.vstack((init_values1, data))
     elif init_values1 is None and init_values2 is not None:
+        init_values2 = np.asarray(init_values2)
         mdt.check.array(init_values2, shape=var1.shape)
         mdt.check.array(data, shape=(len(var1), len(var2)-1))
-        data = np.column_stack((init_values2, data))
     elif init_values1 is not None and init_values2 is not None:
+        init_values1 = np.asarray(init_values1)
+        init_values2 = np.asarray(init_values2)
         mdt.check.array(init_values1, shape=var2.shape)
         mdt.check.array(init_values2, shape=var1.shape)
         mdt.check.array(data, shape=(len(var1)-1, len(var2)-1))
@@ -378,28 +569,105 @@ def savetxt_matrix(  # TODO: Replace arguments by *args, **kwargs
                           " as value for the upper left corner."
                           .format(init_values2[0], init_values1[0]),
                           RuntimeWarning)
-        data = np.column_stack((init_values2[1:], data))
-        data = np.vstack((init_values1, data))
-    data = np.column_stack((var1, data))
-    var2 = np.insert(var2, 0, upper_left)
-    data = np.vstack((var2, data))
-    savetxt(fname=fname,
-            data=data,
-            fmt=fmt,
-            delimiter=delimiter,
-            newline=newline,
-            header=header,
-            footer=footer,
-            comments=comments,
-            encoding=encoding,
-            rename=rename)
+    # Fill the final matrix directly instead of stacking the input
+    # arrays, which would create a new copy of the data at each step.
+    arrays = [a for a in (var1, var2, data, init_values1, init_values2)
+              if a is not None]
+    dtype = np.result_type(upper_left, *arrays)
+    matrix = np.empty((len(var1)+1, len(var2)+1), dtype=dtype)
+    matrix[0, 0] = upper_left
+    matrix[0, 1:] = var2
+    matrix[1:, 0] = var1
+    start_row, start_col = 1, 1
+    if init_values1 is not None:
+        matrix[1, 1:] = init_values1
+        start_row += 1
+    if init_values2 is not None:
+        matrix[start_row:, 1] = init_values2[start_row-1:]
+        start_col += 1
+    matrix[start_row:, start_col:] = data
+    return matrix
+
+
+def save_matrix(fname, data, var1, var2, compress=True, rename=True):
+    """
+    Save a data matrix to a binary :file:`.npz` file.
+    
+    Store data that are a function of two independent variables, `var1`
+    and `var2`, together with the values of the independent variables
+    and the standard MDTools header in numpy's binary :file:`.npz`
+    format.  This is much faster and needs much less disk space than
+    writing the matrix to a text file with
+    :func:`mdtools.file_handler.savetxt_matrix`, because the numbers do
+    not need to be converted to strings.
+    
+    Parameters
+    ----------
+    fname : str
+        The name of the file to create.  If `fname` does not end with
+        :file:`.npz`, this extension is appended.
+    data : array_like
+        2-dimensional array of data to be saved.  Must be of shape
+        ``(n, m)``, where ``n`` is the number of samples of the first
+        independent variable and ``m`` is the mumber of samples of the
+        second independent variable.
+    var1 : array_like
+        Array of shape ``(n,)`` containing the values of the first
+        independent variable at which the data were sampled.
+    var2 : array_like
+        Array of shape ``(m,)`` containing the values of the second
+        independent variable at which the data were sampled.
+    compress : bool, optional
+        If ``True``, compress the file with
+        :func:`numpy.savez_compressed`.  Otherwise, store the arrays
+        uncompressed with :func:`numpy.savez`.
+    rename : bool, optional
+        If ``True`` and a file called `fname` already exists, rename it
+        to ``'fname.bak_timestamp'``.  See
+        :func:`mdtools.file_handler.backup` for more details.
+    
+    See Also
+    --------
+    :func:`mdtools.file_handler.load_matrix` :
+        Load a data matrix from a binary :file:`.npz` file
+    :func:`mdtools.file_handler.savetxt_matrix` :
+        Save a data matrix to a text file
+    :func:`numpy.savez_compressed` :
+        Save several arrays into a single file in compressed
+        :file:`.npz` format
+    
+    Notes
+    -----
+    The arrays are stored under the keys ``'data'``, ``'var1'`` and
+    ``'var2'``.  The header string created by
+    :func:`mdtools.file_handler.header_str` is stored under the key
+    ``'header'``.
+    """
+    var1 = np.asarray(var1)
+    var2 = np.asarray(var2)
+    mdt.check.array(var1, dim=1)
+    mdt.check.array(var2, dim=1)
+    mdt.check.array(data, shape=(len(var1), len(var2)))
+    if not fname.endswith(".npz"):
+        fname += ".npz"
+    if rename:
+        backup(fname)
+    if compress:
+        savez = np.savez_compressed
+    else:
+        savez = np.savez
+    savez(fname,
+          data=data,
+          var1=var1,
+          var2=var2,
+          header=np.array(header_str()))
 
 
 def write_matrix_block(
         fname, data, var1, var2, init_values1=None, init_values2=None,
         upper_left=None, data_name=None, data_unit=None, var1_name=None,
         var1_unit=None, var2_name=None, var2_unit=None,
-        block_number=None):
+        block_number=None, binary_sidecar=False):
     """
     Save a data matrix to a text file.
     
@@ -457,6 +725,12 @@ def write_matrix_block(
     block_number : int
         The number of the data block in `fname`.  If supplied, it will
         be printed in the block header.
+    binary_sidecar : bool, optional
+        If ``True`` and the final matrix has more than one million
+        elements, do not write the matrix as text to `fname`.  Instead,
+        save it in binary format to the companion file
+        :file:`fname.block{block_number}.npy` and write a reference to
+        this file into the block header.  Requires `block_number`.
     
     See Also
     --------
@@ -464,31 +738,29 @@ def write_matrix_block(
         Save a data matrix to a text file
     :func:`mdtools.file_handler.write_header` :
         Create a file and write the standard MDTools header to it
-    """
-    var1 = np.asarray(var1)
-    var2 = np.asarray(var2)
-    mdt.check.array(var1, dim=1)
-    mdt.check.array(var2, dim=1)
-    if init_values1 is None and init_values2 is None:
-        mdt.check.array(data, shape=(len(var1), len(var2)))
-    elif init_values1 is not None and init_values2 is None:
-        mdt.check.array(init_values1, shape=var2.shape)
-        mdt.check.array(data, shape=(len(var1)-1, len(var2)))
-    elif init_values1 is None and init_values2 is not None:
-        mdt.check.array(init_values2, shape=var1.shape)
-        mdt.check.array(data, shape=(len(var1), len(var2)-1))
-    elif init_values1 is not None and init_values2 is not None:
-        mdt.check.array(init_values1, shape=var2.shape)
-        mdt.check.array(init_values2, shape=var1.shape)
-        mdt.check.array(data, shape=(len(var1)-1, len(var2)-1))
-        if init_values2[0] != init_values1[0]:
-            warnings.warn("init_values2[0] ({}) is not the same as"
-                          " init_values1[0] ({}). Using init_values1[0]"
-                          " as value for the upper left corner."
-                          .format(init_values2[0], init_values1[0]),
-                          RuntimeWarning)
     
-    with open(fname, 'a') as outfile:
+    Notes
+    -----
+    Formatting very large matrices as text is slow and inflates the
+    file size considerably.  Use `binary_sidecar` to avoid this.  The
+    companion file can be read with :func:`numpy.load`.  It contains
+    the final matrix as it would have been written to the text file,
+    i.e. the first row contains the values of `var2` and the first
+    column contains the values of `var1`.  If `upper_left` is ``None``,
+    the upper left element of the stored matrix is zero.
+    """
+    if binary_sidecar and block_number is None:
+        raise ValueError("'binary_sidecar' requires 'block_number'")
+    # The upper left corner is written separately.
+    matrix = _prepare_matrix(data=data,
+                             var1=var1,
+                             var2=var2,
+                             init_values1=init_values1,
+                             init_values2=init_values2)
+    
+    # Use a large write buffer to reduce the number of system calls
+    # when writing big matrices.
+    with open(fname, 'a', buffering=2**17) as outfile:
         # Block header
         outfile.write("\n\n\n\n")
         if block_number is not None:
@@ -511,13 +783,22 @@ def write_matrix_block(
                 outfile.write(" in {}\n".format(var2_unit))
             else:
                 outfile.write("\n")
+        if binary_sidecar and matrix.size > 10**6:
+            sidecar = "{}.block{}.npy".format(fname, block_number)
+            if upper_left is not None:
+                matrix[0, 0] = upper_left
+            backup(sidecar)
+            np.save(sidecar, matrix)
+            outfile.write("# Binary data: {}\n"
+                          .format(os.path.basename(sidecar)))
+            return
         # Column numbers
-        num_cols = len(var2)
+        num_cols = matrix.shape[1] - 1
         outfile.write("# Column number:\n")
-        outfile.write("# {:>16}".format("1"))
-        for col_num in range(2, num_cols+2):
-            outfile.write(" {:>16}".format(col_num))
-        outfile.write("\n")
+        # Format entire rows at once with a precompiled row format
+        # instead of formatting and writing each column separately.
+        row_fmt = "# %16d" + " %16d" * num_cols + "\n"
+        outfile.write(row_fmt % tuple(range(1, num_cols+2)))
         # The row after the row with the column numbers contains the
         # values of `var2`.
         if upper_left is None:
@@ -525,42 +806,18 @@ def write_matrix_block(
                           .format(var1_name[:10], var2_name[:9]))
         else:
             outfile.write("{:>18}".format(upper_left))
-        for col_num in range(num_cols):
-            outfile.write(" {:16.9e}".format(var2[col_num]))
-        outfile.write("\n")
-        # If there are any special initial values for the very first
-        # value of `var1`, print them to the next row.
-        if init_values1 is not None:
-            outfile.write("  {:16.9e}".format(var1[0]))
-            for col_num in range(num_cols):
-                outfile.write(" {:16.9e}".format(init_values1[col_num]))
-            outfile.write("\n")
-            start_row = 1
-        else:
-            start_row = 0
-        # Print remaining rows. The first column always contains the
-        # current value of `var1`. The remaining columns contain the
-        # data.
-        num_rows = len(var1)
-        for row_num in range(start_row, num_rows):
-            outfile.write("  {:16.9e}".format(var1[row_num]))
-            # If there are any special initial values for the very first
-            # value of `var2`, print them to the second column.
-            if init_values2 is not None:
-                outfile.write(" {:16.9e}".format(init_values2[row_num]))
-                start_col = 1
-            else:
-                start_col = 0
-            for col_num in range(start_col, num_cols):
-                outfile.write(
-                    " {:16.9e}"
-                    .format(data[row_num-start_row][col_num-start_col])
-                )
-            outfile.write("\n")
-        outfile.flush()
+        row_fmt = " %16.9e" * num_cols + "\n"
+        outfile.write(row_fmt % tuple(matrix[0, 1:].tolist()))
+        # The remaining rows contain the current value of `var1` in the
+        # first column and the data in the remaining columns.  If there
+        # are any special initial values for the very first value of
+        # `var1` or `var2`, they are in the second row or in the second
+        # column, respectively.
+        row_fmt = "  %16.9e" + " %16.9e" * num_cols + "\n"
+        _write_rows(outfile, matrix[1:], row_fmt)
 
 
-def load_dtrj(fname, **kwargs):
+def load_dtrj(fname, mmap_threshold=2**29, **kwargs):
     """
     Load a discrete trajectory stored as :class:`numpy.ndarray` from a
     binary :file:`.npy` file.
@@ -578,12 +835,18 @@ def load_dtrj(fname, **kwargs):
         because, the elements of a discrete trajectory are interpreted
         as the indices of the states in which a given compound is at a
         given frame.
+    mmap_threshold : int or None, optional
+        If `kwargs` does not contain `mmap_mode` and the file is larger
+        than `mmap_threshold` bytes (default: 512 MiB), the file is
+        memory-mapped in copy-on-write mode (``mmap_mode='c'``) instead
+        of being read completely into memory.  If ``None``, the file is
+        never memory-mapped automatically.
     kwargs : dict
         Additional keyword arguments to parse to :func:`numpy.load`.
     
     Returns
     -------
-    dtrj : numpy.ndarray
+    dtrj : numpy.ndarray or numpy.memmap
         The discrete trajectory loaded from file.
     
     See Also
@@ -596,7 +859,55 @@ def load_dtrj(fname, **kwargs):
     -----
     This function simply calls :func:`numpy.load` and checks whether
     the loaded :class:`numpy.ndarray` is a suitable discrete trajectory.
+    
+    Memory-mapping large files avoids reading the entire trajectory
+    into memory at once.  Instead, the operating system loads the data
+    on demand when they are actually accessed.  Because of the
+    copy-on-write mode, the returned array can still be modified
+    without altering the file on disk.
     """
+    if ("mmap_mode" not in kwargs and
+            mmap_threshold is not None and
+            os.path.getsize(fname) > mmap_threshold):
+        kwargs["mmap_mode"] = 'c'
     dtrj = np.load(fname, **kwargs)
     mdt.check.dtrj(dtrj)
     return dtrj
+
+
+def load_matrix(fname, **kwargs):
+    """
+    Load a data matrix from a binary :file:`.npz` file.
+    
+    Parameters
+    ----------
+    fname : str
+        Name of the file containing the data matrix.  The file must
+        have been created with :func:`mdtools.file_handler.save_matrix`.
+    kwargs : dict
+        Additional keyword arguments to parse to :func:`numpy.load`.
+    
+    Returns
+    -------
+    data : numpy.ndarray
+        The data matrix of shape ``(n, m)``.
+    var1 : numpy.ndarray
+        Array of shape ``(n,)`` containing the values of the first
+        independent variable.
+    var2 : numpy.ndarray
+        Array of shape ``(m,)`` containing the values of the second
+        independent variable.
+    
+    See Also
+    --------
+    :func:`mdtools.file_handler.save_matrix` :
+        Save a data matrix to a binary :file:`.npz` file
+    :func:`numpy.load` :
+        Load arrays or pickled objects from :file:`.npy`, :file:`.npz`
+        or pickled files
+    """
+    with np.load(fname, **kwargs) as npzfile:
+        data = npzfile['data']
+        var1 = npzfile['var1']
+        var2 = npzfile['var2']
+    return data, var1, var2
@@ -34,11 +34,44 @@ import psutil
 import argparse
 import numpy as np
 from scipy.special import gamma
+from scipy.fft import rfft, irfft, next_fast_len
 import mdtools as mdt
 
 
 
 
+# Number of set bits in each possible byte value
+BITCOUNTS = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def count_bits(packed, axis=None):
+    """
+    Count the number of set bits in an array of bit-packed booleans.
+    
+    Parameters
+    ----------
+    packed : numpy.ndarray
+        Array of dtype :attr:`numpy.uint8` as returned by
+        :func:`numpy.packbits`.
+    axis : int, optional
+        Axis along which to count the set bits.  By default, all set
+        bits in the array are counted.
+    
+    Returns
+    -------
+    n_bits : int or numpy.ndarray
+        The number of set bits along the given axis.
+    """
+    if hasattr(np, "bitwise_count"):
+        # Hardware popcount, available since numpy 2.0
+        return np.sum(np.bitwise_count(packed), axis=axis, dtype=np.int64)
+    else:
+        # Look-up table
+        return np.sum(BITCOUNTS[packed], axis=axis, dtype=np.int64)
+
+
+
+
 # Also used by state_lifetime_autocorr_discrete.py
 def dtraj_transition_info(dtraj):
     """
@@ -96,34 +129,20 @@ def dtraj_transition_info(dtraj):
     never_neg = np.count_nonzero(np.all(dtraj>=0, axis=0))
     n_frames_neg = np.count_nonzero(dtraj<0)
     
-    n_compounds = dtraj.shape[1]
-    transitions = (np.diff(dtraj, axis=0) != 0)
-    trans_init = np.vstack([transitions, np.zeros(n_compounds, dtype=bool)])
-    trans_final = np.insert(transitions, 0, np.zeros(n_compounds), axis=0)
+    # transitions[i] marks the compounds whose state changes between
+    # frame i and frame i+1.
+    transitions = (dtraj[1:] != dtraj[:-1])
     n_trans = np.count_nonzero(transitions)
-    if np.count_nonzero(trans_init) != n_trans:
-        raise ValueError("The number of transitions in trans_init is not"
-                         " the same as in transitions. This should not"
-                         " have happened")
-    if np.count_nonzero(trans_final) != n_trans:
-        raise ValueError("The number of transitions in trans_final is"
-                         " not the same as in transitions. This should"
-                         " not have happened")
-    pos2pos = np.count_nonzero((dtraj[trans_init] >= 0) &
-                               (dtraj[trans_final] >= 0))
-    pos2neg = np.count_nonzero((dtraj[trans_init] >= 0) &
-                               (dtraj[trans_final] < 0))
-    neg2pos = np.count_nonzero((dtraj[trans_init] < 0) &
-                               (dtraj[trans_final] >= 0))
-    neg2neg = np.count_nonzero((dtraj[trans_init] < 0) &
-                               (dtraj[trans_final] < 0))
-    if pos2pos + pos2neg + neg2pos + neg2neg != n_trans:
-        raise ValueError("The sum of Positive <-> Negative transitions"
-                         " ({}) is not equal to the total number of"
-                         " transitions ({}). This should not have"
-                         " happened"
-                         .format(pos2pos+pos2neg+neg2pos+neg2neg,
-                                 n_trans))
+    # Whether the initial and final states of each transition are
+    # positive
+    init_pos = (dtraj[:-1][transitions] >= 0)
+    final_pos = (dtraj[1:][transitions] >= 0)
+    del transitions
+    # All four counts follow from three popcounts.
+    pos2pos = np.count_nonzero(init_pos & final_pos)
+    pos2neg = np.count_nonzero(init_pos) - pos2pos
+    neg2pos = np.count_nonzero(final_pos) - pos2pos
+    neg2neg = n_trans - pos2pos - pos2neg - neg2pos
     
     return (n_stay, always_neg, never_neg, n_frames_neg,
             n_trans, pos2pos, pos2neg, neg2pos, neg2neg)
@@ -131,7 +150,313 @@ def dtraj_transition_info(dtraj):
 
 
 
-def autocorr_dtraj(dtraj, restart=1, cut=False, cut_and_merge=False):
+def dtraj_matches_fft(dtraj, restart=1):
+    """
+    Count how often compounds are in the same state at time :math:`t_0`
+    and :math:`t_0+\tau` using fast Fourier transforms.
+    
+    For each lag time :math:`\tau`, count the number of compounds that
+    are in the same state at time :math:`t_0+\tau` as at time
+    :math:`t_0` and sum this number over all restarting points
+    :math:`t_0`.  Instead of comparing all pairs of frames, the
+    correlation of the indicator function of each state is calculated
+    via the Wiener-Khinchin theorem in :math:`O(f \log f)` time.
+    Compounds that stay in the same state during the entire trajectory
+    match at every restarting point for every lag time.  Their
+    contribution is therefore added analytically and they are excluded
+    from the Fourier transforms.
+    
+    Parameters
+    ----------
+    dtraj : array_like
+        The discretized trajectory. Array of shape ``(f, n)`` where ``f``
+        is the number of frames and ``n`` is the number of compounds.
+        The elements of `dtraj` are interpreted as the indices of the
+        states in which a given compound is at a given frame.
+    restart : int, optional
+        Number of frames between restarting points :math:`t_0`.
+    
+    Returns
+    -------
+    matches : numpy.ndarray
+        Array of shape ``f`` containing the number of matches for each
+        lag time :math:`\tau`.  The first element (:math:`\tau = 0`)
+        is the total number of restarting points summed over all
+        compounds.
+    """
+    
+    dtraj = np.asarray(dtraj)
+    n_frames = dtraj.shape[0]
+    stay = np.all(dtraj==dtraj[0], axis=0)
+    n_stay = np.count_nonzero(stay)
+    if n_stay > 0:
+        dtraj = dtraj[:,~stay]
+    n_compounds = dtraj.shape[1]
+    # Zero padding to avoid circular correlation.
+    n_fft = next_fast_len(2*n_frames-1, real=True)
+    is_restart = np.zeros(n_frames, dtype=bool)
+    is_restart[0:n_frames-1:restart] = True
+    spectrum = np.zeros(n_fft//2+1, dtype=np.complex128)
+    # Process the compounds in chunks to limit the memory consumption.
+    chunksize = max(1, 2**22 // n_fft)
+    for start in range(0, n_compounds, chunksize):
+        dtraj_chunk = dtraj[:, start:start+chunksize]
+        # Only states that are occupied at restarting points contribute.
+        for state in np.unique(dtraj_chunk[is_restart]):
+            indicator = (dtraj_chunk == state)
+            ft = rfft(indicator, n=n_fft, axis=0)
+            if restart == 1:
+                # The last frame is no restarting point, but it only
+                # contributes to the lag time zero, which is set
+                # explicitly below.
+                spectrum += np.sum(ft.real**2 + ft.imag**2, axis=1)
+            else:
+                indicator &= is_restart[:, np.newaxis]
+                ft_restart = rfft(indicator, n=n_fft, axis=0)
+                spectrum += np.sum(np.conj(ft_restart) * ft, axis=1)
+    # The exact result is integer.
+    matches = np.rint(irfft(spectrum, n=n_fft)[:n_frames]).astype(np.int64)
+    if n_stay > 0:
+        # Number of restarting points t0 with t0+lag < n_frames.
+        n_restarts = -(-np.arange(n_frames, 0, -1) // restart)
+        matches += n_stay * n_restarts
+    # At lag time zero, every compound matches at every restarting
+    # point.
+    matches[0] = (n_compounds+n_stay) * np.count_nonzero(is_restart)
+    return matches
+
+
+
+
+def _lag_chunksize(dtraj):
+    """
+    Get the number of lag times that are processed at once by
+    :func:`dtraj_matches_cut` and :func:`dtraj_matches_cut_and_merge`.
+    
+    Instead of looping over single lag times, all lag times of a chunk
+    are processed at once with vectorized numpy operations.  The chunk
+    size is chosen such that the slab of the trajectory and the boolean
+    scratch array, both of shape ``(lag_chunksize, n)``, together fit
+    into roughly 1 MiB (the size of a typical L2 cache).  The slab is
+    then still cache resident when it is compared to ``dtraj[t0]`` and
+    counted.
+    """
+    row_bytes = dtraj.shape[1] * (dtraj.itemsize + 1)
+    return max(1, 2**20 // max(1, row_bytes))
+
+
+def _progress_points(n_frames, restart):
+    """
+    Get the restarting points at which the progress of the loop over
+    restarting points is printed.
+    
+    These are the restarting points ``0, 1, ..., 9, 10, 20, ..., 90,
+    100, 200, ...`` and the last frame that can be a restarting point.
+    The set is computed once, so that the loop only needs a cheap
+    membership test instead of evaluating the criterion for every
+    restarting point.
+    """
+    points = set()
+    candidates = [0, n_frames-2]
+    power = 1
+    while power < n_frames-1:
+        candidates.extend(k*power for k in range(1, 10))
+        power *= 10
+    for t0 in candidates:
+        if 0 <= t0 < n_frames-1 and t0 % restart == 0:
+            points.add(t0)
+    return points
+
+
+def _print_progress(t0, n_frames, timer, block=None):
+    """
+    Print the progress of the loop over restarting points.
+    
+    If `block` is not ``None``, each line is prefixed with the block
+    index, so that the output of blocks that are analyzed in parallel
+    can be told apart.  Returns the current time, which is the new
+    value for `timer`.
+    """
+    if block is None:
+        prefix = ""
+    else:
+        prefix = "  [Block {:d}]".format(block)
+    # Write both lines including the final newline at once, so that
+    # they are not separated by the output of other processes.
+    print("{}  Restart {:12d} of {:12d}\n"
+          "{}    Elapsed time:             {}\n"
+          .format(prefix, t0, n_frames-2, prefix, datetime.now()-timer),
+          end='',
+          flush=True)
+    return datetime.now()
+
+
+
+
+def dtraj_matches_cut(dtraj, restart=1, block=None):
+    """
+    Count how often compounds are in the same state at time :math:`t_0`
+    and :math:`t_0+\tau` when negative states are cut out of the
+    trajectory without merging the cutting edges.
+    
+    See the `cut` option of :func:`autocorr_dtraj` for details.
+    
+    Parameters
+    ----------
+    dtraj : numpy.ndarray
+        The discretized trajectory. Array of shape ``(f, n)`` where ``f``
+        is the number of frames and ``n`` is the number of compounds.
+    restart : int, optional
+        Number of frames between restarting points :math:`t_0`.
+    block : int, optional
+        Index of the analyzed block.  If given, it is prepended to the
+        progress output.
+    
+    Returns
+    -------
+    matches : numpy.ndarray
+        Array of shape ``f`` containing the number of matches for each
+        lag time :math:`\tau`, summed over all restarting points.  The
+        first element is zero.
+    norm : numpy.ndarray
+        Array of shape ``f`` containing the number of compounds whose
+        states at :math:`t_0` and :math:`t_0+\tau` have the same
+        validity, summed over all restarting points.  The first element
+        is zero.
+    """
+    
+    n_frames, n_compounds = dtraj.shape
+    matches = np.zeros(n_frames, dtype=np.int64)
+    norm = np.zeros(n_frames, dtype=np.int64)
+    # Bit-packed validity of all frames.  Comparing the validity of two
+    # frames is done by an XOR and a popcount, which processes 8
+    # compounds per byte.
+    valid_packed = np.packbits(dtraj >= 0, axis=1)
+    lag_chunksize = _lag_chunksize(dtraj)
+    # Scratch arrays that are reused for all chunks, so that no large
+    # temporary arrays are allocated inside the loops.
+    autocov_buf = np.empty((lag_chunksize, n_compounds), dtype=bool)
+    xor_buf = np.empty((lag_chunksize, valid_packed.shape[1]),
+                       dtype=np.uint8)
+    
+    print_points = _progress_points(n_frames, restart)
+    timer = datetime.now()
+    for t0 in range(0, n_frames-1, restart):
+        if t0 in print_points:
+            timer = _print_progress(t0, n_frames, timer, block)
+        # Loop invariants
+        row0 = dtraj[t0]
+        valid0 = valid_packed[t0]
+        upper = n_frames - t0
+        for lag_start in range(1, upper, lag_chunksize):
+            lag_stop = min(lag_start+lag_chunksize, upper)
+            n_lags = lag_stop - lag_start
+            dtraj_lag = dtraj[t0+lag_start:t0+lag_stop]
+            # Number of compounds whose states at t0 and t0+lag have
+            # the same validity.
+            xor = np.bitwise_xor(valid_packed[t0+lag_start:t0+lag_stop],
+                                 valid0,
+                                 out=xor_buf[:n_lags])
+            n_valid3 = n_compounds - count_bits(xor, axis=1)
+            # Stop at the first lag time at which no compound is in a
+            # state with the same validity as at t0.  n_valid3 is never
+            # negative, so its first minimum is its first zero, if any.
+            first_min = np.argmin(n_valid3)
+            no_valid3 = (n_valid3[first_min] == 0)
+            if no_valid3:
+                lag_stop = lag_start + first_min
+                n_lags = lag_stop - lag_start
+                dtraj_lag = dtraj_lag[:n_lags]
+                n_valid3 = n_valid3[:n_lags]
+            # Compounds in the same state at t0 and t0+lag are always
+            # also in states with the same validity.  Hence, `autocov`
+            # does not need to be masked with the validity.
+            autocov = np.equal(dtraj_lag, row0, out=autocov_buf[:n_lags])
+            matches[lag_start:lag_stop] += np.count_nonzero(autocov,
+                                                            axis=1)
+            norm[lag_start:lag_stop] += n_valid3
+            if no_valid3:
+                break
+    
+    return matches, norm
+
+
+
+
+def dtraj_matches_cut_and_merge(dtraj, restart=1, block=None):
+    """
+    Count how often compounds are in the same state at time :math:`t_0`
+    and :math:`t_0+\tau` when negative states are cut out of the
+    trajectory and the cutting edges are merged.
+    
+    See the `cut_and_merge` option of :func:`autocorr_dtraj` for
+    details.
+    
+    Parameters
+    ----------
+    dtraj : numpy.ndarray
+        The discretized trajectory. Array of shape ``(f, n)`` where ``f``
+        is the number of frames and ``n`` is the number of compounds.
+    restart : int, optional
+        Number of frames between restarting points :math:`t_0`.
+    block : int, optional
+        Index of the analyzed block.  If given, it is prepended to the
+        progress output.
+    
+    Returns
+    -------
+    matches : numpy.ndarray
+        Array of shape ``f`` containing the number of matches for each
+        lag time :math:`\tau`, summed over all restarting points.  The
+        first element is zero.
+    norm : numpy.ndarray
+        Array of shape ``f`` containing the number of compounds in a
+        positive state at :math:`t_0`, summed over all restarting
+        points that have a lag time :math:`\tau` left in the
+        trajectory.  The first element is zero.
+    """
+    
+    n_frames, n_compounds = dtraj.shape
+    matches = np.zeros(n_frames, dtype=np.int64)
+    norm = np.zeros(n_frames, dtype=np.int64)
+    # Validity of all frames and number of valid compounds per frame
+    # are computed once instead of once per restarting point.
+    valid_all = (dtraj >= 0)
+    n_valid_all = np.count_nonzero(valid_all, axis=1)
+    lag_chunksize = _lag_chunksize(dtraj)
+    # Scratch array that is reused for all chunks, so that no large
+    # temporary arrays are allocated inside the loops.
+    autocov_buf = np.empty((lag_chunksize, n_compounds), dtype=bool)
+    
+    print_points = _progress_points(n_frames, restart)
+    timer = datetime.now()
+    for t0 in range(0, n_frames-1, restart):
+        if t0 in print_points:
+            timer = _print_progress(t0, n_frames, timer, block)
+        valid = valid_all[t0]
+        n_valid = n_valid_all[t0]
+        if n_valid == 0:
+            continue
+        # Loop invariants
+        row0 = dtraj[t0]
+        upper = n_frames - t0
+        norm[1:upper] += n_valid
+        for lag_start in range(1, upper, lag_chunksize):
+            lag_stop = min(lag_start+lag_chunksize, upper)
+            autocov = np.equal(dtraj[t0+lag_start:t0+lag_stop],
+                               row0,
+                               out=autocov_buf[:lag_stop-lag_start])
+            autocov &= valid
+            matches[lag_start:lag_stop] += np.count_nonzero(autocov,
+                                                            axis=1)
+    
+    return matches, norm
+
+
+
+
+def autocorr_dtraj(dtraj, restart=1, cut=False, cut_and_merge=False,
+                   block=None):
     """
     Calculate the autocorrelation function of a discretized trajectory,
     with the speciality that the autocovariance is set to one, if the
@@ -195,6 +520,10 @@ def autocorr_dtraj(dtraj, restart=1, cut=False, cut_and_merge=False):
         transitions starting from negative states are ignored, as well
         as compounds that stay in the same negative state. `cut` and
         `cut_and_merge` are mutually exclusive.
+    block : int, optional
+        Index of the analyzed block.  If given, it is prepended to the
+        progress output, so that the output of blocks that are analyzed
+        in parallel can be told apart.
     
     Returns
     -------
@@ -206,7 +535,9 @@ def autocorr_dtraj(dtraj, restart=1, cut=False, cut_and_merge=False):
     dtraj = np.asarray(dtraj)
     if dtraj.ndim != 2:
         raise ValueError("dtraj must have two dimensions")
-    if np.any(np.modf(dtraj)[0] != 0):
+    # Integer arrays cannot contain non-integer elements.
+    if (dtraj.dtype.kind not in ('i', 'u') and
+            np.any(np.modf(dtraj)[0] != 0)):
         warnings.warn("At least one element of the discrete trajectory"
                       " is not an integer", RuntimeWarning)
     
@@ -221,67 +552,23 @@ def autocorr_dtraj(dtraj, restart=1, cut=False, cut_and_merge=False):
     
     n_frames = dtraj.shape[0]
     n_compounds = dtraj.shape[1]
-    autocorr = np.zeros(n_frames, dtype=np.float32)
-    autocov = np.zeros(n_compounds, dtype=bool)
     
-    if cut or cut_and_merge:
-        valid = np.zeros(n_compounds, dtype=bool)
-        norm = np.zeros(n_frames, dtype=np.uint32)
+    # The matches are counted with integers, which is exact, and
+    # converted to floating point numbers only for normalization.
     if cut:
-        valid2 = np.zeros(n_compounds, dtype=bool)
-        valid3 = np.zeros(n_compounds, dtype=bool)
-    
-    
-    proc = psutil.Process(os.getpid())
-    timer = datetime.now()
-    for t0 in range(0, n_frames-1, restart):
-        if t0 % 10**(len(str(t0))-1) == 0 or t0 == n_frames-2:
-            print("  Restart {:12d} of {:12d}"
-                  .format(t0, n_frames-2),
-                  flush=True)
-            print("    Elapsed time:             {}"
-                  .format(datetime.now()-timer),
-                  flush=True)
-            print("    Current memory usage: {:18.2f} MiB"
-                  .format(proc.memory_info().rss/2**20),
-                  flush=True)
-            timer = datetime.now()
-        
-        if cut:
-            np.greater_equal(dtraj[t0], 0, out=valid)
-            for lag in range(1, n_frames-t0):
-                np.greater_equal(dtraj[t0+lag], 0, out=valid2)
-                np.equal(valid, valid2, out=valid3)
-                if not np.any(valid3):
-                    break
-                np.equal(dtraj[t0], dtraj[t0+lag], out=autocov)
-                autocorr[lag] += np.count_nonzero(autocov[valid3])
-                norm[lag] += np.count_nonzero(valid3)
-        #if cut:
-            #np.greater_equal(dtraj[t0], 0, out=valid)
-            #for lag in range(1, n_frames-t0):
-                #np.greater_equal(dtraj[t0+lag], 0, out=valid2)
-                #valid &= valid2
-                #if not np.any(valid):
-                    #break
-                #np.equal(dtraj[t0], dtraj[t0+lag], out=autocov)
-                #autocorr[lag] += np.count_nonzero(autocov[valid])
-                #norm[lag] += np.count_nonzero(valid)
-        elif cut_and_merge:
-            np.greater_equal(dtraj[t0], 0, out=valid)
-            n_valid = np.count_nonzero(valid)
-            if n_valid == 0:
-                continue
-            norm[1:n_frames-t0] += n_valid
-            for lag in range(1, n_frames-t0):
-                np.equal(dtraj[t0], dtraj[t0+lag], out=autocov)
-                autocorr[lag] += np.count_nonzero(autocov[valid])
-        else:  # not cut and not cut_and_merge
-            for lag in range(1, n_frames-t0):
-                np.equal(dtraj[t0], dtraj[t0+lag], out=autocov)
-                autocorr[lag] += np.count_nonzero(autocov)
-    
-    del dtraj, autocov
+        matches, norm = dtraj_matches_cut(dtraj, restart, block)
+    elif cut_and_merge:
+        matches, norm = dtraj_matches_cut_and_merge(dtraj, restart,
+                                                    block)
+    else:
+        # Without cutting, the number of matches can be calculated via
+        # the Wiener-Khinchin theorem, which is much faster than looping
+        # over all restarting points and lag times.
+        matches = dtraj_matches_fft(dtraj, restart)
+        matches[0] = 0
+    del dtraj
+    autocorr = matches.astype(np.float32)
+    del matches
     
     
     if cut or cut_and_merge:
@@ -301,12 +588,6 @@ def autocorr_dtraj(dtraj, restart=1, cut=False, cut_and_merge=False):
         raise ValueError("The first element of autocorr is not zero."
                          " This should not have happened")
     autocorr[0] = 1
-    if np.any(autocorr > 1):
-        raise ValueError("At least one element of autocorr is greater"
-                         " than one. This should not have happened")
-    if np.any(autocorr < 0):
-        raise ValueError("At least one element of autocorr is less than"
-                         " zero. This should not have happened")
     
     return autocorr
 
@@ -347,7 +628,13 @@ if __name__ == '__main__':
                      " state will increase the autocorrelation function"
                      " again. However, in state_decay.py compounds that"
                      " return into their initial states will not have"
-                     " any influence."
+                     " any influence. The blocks for block averaging are"
+                     " analyzed in parallel. The number of CPUs to use"
+                     " is specified (in decreasing precedence) by either"
+                     " one of the environment variables OMP_NUM_THREADS,"
+                     " SLURM_CPUS_PER_TASK, SLURM_JOB_CPUS_PER_NODE,"
+                     " SLURM_CPUS_ON_NODE or python intern by"
+                     " os.cpu_count()."
                      )
     )
     group = parser.add_mutually_exclusive_group()
@@ -496,22 +783,23 @@ if __name__ == '__main__':
     print("Reading input", flush=True)
     timer = datetime.now()
     
-    dtrajs = np.load(args.TRJFILE)
+    # Memory-map the input file, so that only the frames that are
+    # actually analyzed are read into memory.
+    dtrajs = np.load(args.TRJFILE, mmap_mode='r')
     if dtrajs.ndim == 1:
         dtrajs = np.expand_dims(dtrajs, axis=0)
     elif dtrajs.ndim > 2:
         raise ValueError("The discrete trajectory must have one or two"
                          " dimensions")
-    dtrajs = np.asarray(dtrajs.T, order='C')
+    # Only a transposed view for now.  The frames that are actually
+    # analyzed are copied to a C-contiguous array after frame slicing.
+    dtrajs = dtrajs.T
     n_frames = dtrajs.shape[0]
     n_compounds = dtrajs.shape[1]
     print("  Number of frames:    {:>9d}".format(n_frames), flush=True)
     print("  Number of compounds: {:>9d}"
           .format(n_compounds),
           flush=True)
-    if np.any(np.modf(dtrajs)[0] != 0):
-        warnings.warn("At least one element of the discrete trajectory"
-                      " is not an integer", RuntimeWarning)
     
     BEGIN, END, EVERY, n_frames = mdt.check.frame_slicing(
                                       start=args.BEGIN,
@@ -524,9 +812,27 @@ if __name__ == '__main__':
                                      restart_every_nth_frame=args.RESTART,
                                      read_every_nth_frame=EVERY,
                                      n_frames=blocksize)
-    dtrajs = dtrajs[BEGIN:END:EVERY]
-    
-    trans_info = dtraj_transition_info(dtraj=dtrajs[:NBLOCKS*blocksize])
+    # Only the frames that belong to a block are analyzed.  Read only
+    # these frames from the memory-mapped file.
+    dtrajs = np.ascontiguousarray(
+        dtrajs[BEGIN:END:EVERY][:NBLOCKS*blocksize]
+    )
+    if (dtrajs.dtype.kind not in ('i', 'u') and
+            np.any(np.modf(dtrajs)[0] != 0)):
+        warnings.warn("At least one element of the discrete trajectory"
+                      " is not an integer", RuntimeWarning)
+    else:
+        # Use the smallest integer type that can hold all state indices.
+        # The analysis is dominated by comparing states, which is
+        # bandwidth-bound, so smaller types speed it up.
+        state_min, state_max = np.min(dtrajs), np.max(dtrajs)
+        for int_type in (np.int8, np.int16, np.int32):
+            if (np.iinfo(int_type).min <= state_min and
+                    state_max <= np.iinfo(int_type).max):
+                dtrajs = dtrajs.astype(int_type)
+                break
+    
+    trans_info = dtraj_transition_info(dtraj=dtrajs)
     
     print("Elapsed time:         {}"
           .format(datetime.now()-timer),
@@ -543,25 +849,45 @@ if __name__ == '__main__':
     timer = datetime.now()
     timer_block = datetime.now()
     
-    autocorr = [None,] * NBLOCKS
-    for block in range(NBLOCKS):
-        if block % 10**(len(str(block))-1) == 0 or block == NBLOCKS-1:
-            print(flush=True)
-            print("  Block   {:12d} of {:12d}"
-                  .format(block, NBLOCKS-1),
-                  flush=True)
-            print("    Elapsed time:             {}"
-                  .format(datetime.now()-timer_block),
-                  flush=True)
-            print("    Current memory usage: {:18.2f} MiB"
-                  .format(proc.memory_info().rss/2**20),
-                  flush=True)
-            timer_block = datetime.now()
-        autocorr[block] = autocorr_dtraj(
-                              dtraj=dtrajs[block*blocksize:(block+1)*blocksize],
-                              restart=effective_restart,
-                              cut=args.CUT,
-                              cut_and_merge=args.CUT_AND_MERGE)
+    num_CPUs = min(NBLOCKS, mdt.rti.get_num_CPUs())
+    if num_CPUs > 1:
+        # The blocks are independent of each other and are therefore
+        # analyzed in parallel.
+        print("  Number of processes: {}".format(num_CPUs), flush=True)
+        pool = mdt.parallel.ProcessPool(nprocs=num_CPUs)
+        for block in range(NBLOCKS):
+            pool.submit_task(
+                func=autocorr_dtraj,
+                args=(dtrajs[block*blocksize:(block+1)*blocksize],
+                      effective_restart,
+                      args.CUT,
+                      args.CUT_AND_MERGE,
+                      block)
+            )
+        autocorr = list(pool.get_results())
+        pool.close()
+        pool.join()
+    else:
+        autocorr = [None,] * NBLOCKS
+        for block in range(NBLOCKS):
+            if block % 10**(len(str(block))-1) == 0 or block == NBLOCKS-1:
+                print(flush=True)
+                print("  Block   {:12d} of {:12d}"
+                      .format(block, NBLOCKS-1),
+                      flush=True)
+                print("    Elapsed time:             {}"
+                      .format(datetime.now()-timer_block),
+                      flush=True)
+                print("    Current memory usage: {:18.2f} MiB"
+                      .format(proc.memory_info().rss/2**20),
+                      flush=True)
+                timer_block = datetime.now()
+            autocorr[block] = autocorr_dtraj(
+                dtraj=dtrajs[block*blocksize:(block+1)*blocksize],
+                restart=effective_restart,
+                cut=args.CUT,
+                cut_and_merge=args.CUT_AND_MERGE
+            )
     del dtrajs
     
     autocorr = np.asarray(autocorr)
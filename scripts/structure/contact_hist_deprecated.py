@@ -34,23 +34,574 @@ import sys
 import os
 import warnings
 import argparse
+from itertools import chain
 from datetime import datetime, timedelta
 # Third party libraries
 import psutil
 import numpy as np
+from scipy import sparse
+from scipy.spatial import cKDTree
+import MDAnalysis.lib.distances as mdadist
 # Local application/library specific imports
 import mdtools as mdt
 
 
+def _hist_same_bonds(rows, bonds, minlength=0, n_rows=None, n_mats=1):
+    """
+    Bin the number of bonds that connect reference compounds to the
+    same selection compound into a histogram.
+    
+    Parameters
+    ----------
+    rows : numpy.ndarray
+        Index of the reference compound of each connected
+        reference-selection compound pair.
+    bonds : numpy.ndarray
+        Number of bonds (contacts) of each connected pair.
+    minlength : int, optional
+        A minimum number of bins for the output array.
+    n_rows : int, optional
+        Number of reference compounds per histogram.  If given, `rows`
+        can contain the rows of several stacked matrices, the rows of
+        the i-th matrix being offset by ``i * n_rows``, and one
+        histogram is created for each matrix.
+    n_mats : int, optional
+        Number of stacked matrices.  Only used if `n_rows` is given.
+    
+    Returns
+    -------
+    hist : numpy.ndarray
+        Array of dtype :attr:`numpy.uint32`.  The n-th element is the
+        number of reference compounds that are connected to at least one
+        selection compound via exactly n bonds.  The first element is
+        zero.  If `n_rows` is given, the array is two dimensional and
+        contains one histogram per stacked matrix.
+    
+    Notes
+    -----
+    All bins are filled in a single pass: Each reference compound is
+    counted only once per number of bonds by taking the unique
+    combinations of `rows` and `bonds`.
+    """
+    max_bonds = max(int(np.max(bonds, initial=0)) + 1, minlength)
+    # Work in place on as few temporary arrays as possible.
+    rows_bonds = rows.astype(np.int64, copy=False) * max_bonds
+    rows_bonds += bonds
+    rows_bonds = np.unique(rows_bonds)
+    rows, bonds = np.divmod(rows_bonds, max_bonds)
+    del rows_bonds
+    if n_rows is None:
+        hist = np.bincount(bonds, minlength=max_bonds)
+        return hist.astype(np.uint32)
+    rows //= n_rows
+    rows *= max_bonds
+    rows += bonds
+    hist = np.bincount(rows, minlength=n_mats*max_bonds)
+    return hist.reshape(n_mats, max_bonds).astype(np.uint32)
+
+
+def _compact_ix(values):
+    """
+    Map integer values to consecutive indices.
+    
+    Parameters
+    ----------
+    values : array_like
+        Array of integers, e.g. residue IDs.
+    
+    Returns
+    -------
+    ix : numpy.ndarray
+        Array of the same shape as `values` containing for each element
+        the index of its value in the sorted array of unique values.
+        This is the same as
+        ``np.unique(values, return_inverse=True)[1]``.
+    n_unique : int
+        The number of unique values.
+    
+    Notes
+    -----
+    Instead of sorting `values`, a lookup table spanning the range of
+    `values` is built, which takes linear time.
+    """
+    values = np.asarray(values)
+    if values.size == 0:
+        return np.zeros(values.shape, dtype=np.intp), 0
+    offset = np.min(values)
+    values = values - offset
+    present = np.zeros(np.max(values)+1, dtype=bool)
+    present[values] = True
+    lut = np.cumsum(present, dtype=np.intp)
+    del present
+    n_unique = int(lut[-1])
+    lut -= 1
+    return lut[values], n_unique
+
+
+def _bincount_uint32(x, length, mats=None, n_mats=1, zero_first=False):
+    """
+    Count the number of occurrences of each value in an array of
+    non-negative integers.
+    
+    Parameters
+    ----------
+    x : array_like
+        Array of non-negative integers smaller than `length`.
+    length : int
+        Number of bins of the histogram.
+    mats : array_like, optional
+        Index of the matrix each element of `x` belongs to.  Must be
+        broadcastable to the shape of `x`.  If given, one histogram is
+        created for each of the `n_mats` matrices.
+    n_mats : int, optional
+        Number of matrices.  Only used if `mats` is given.
+    zero_first : bool, optional
+        If ``True``, set the first bin of the histogram(s) to zero.
+    
+    Returns
+    -------
+    hist : numpy.ndarray
+        Array of dtype :attr:`numpy.uint32` and length `length`.  If
+        `mats` is given, the array has the shape ``(n_mats, length)``.
+    """
+    if mats is None:
+        hist = np.bincount(np.ravel(x), minlength=length)
+    else:
+        x = np.asarray(mats) * length + x
+        hist = np.bincount(x.ravel(), minlength=n_mats*length)
+        hist = hist.reshape(n_mats, length)
+    hist = hist.astype(np.uint32)
+    if zero_first:
+        hist[..., 0] = 0
+    return hist
+
+
+def _contact_hist_kernel(
+        ref_ix, sel_ix, refres_ix, selres_ix, selresindex_ix, n_refatm,
+        n_refres, n_selatm, n_selres, n_selresindices,
+        expected_max_contacts=16, refatm_only=False):
+    """
+    Bin a list of reference-selection atom pairs into the contact
+    histograms returned by :func:`contact_hist`.
+    
+    Parameters
+    ----------
+    ref_ix, sel_ix : numpy.ndarray
+        Indices of the reference and selection atoms of each pair of
+        atoms that are in contact with each other.
+    refres_ix : numpy.ndarray or None
+        Residue index of each reference atom.  Must be smaller than
+        `n_refres` and each index from zero to `n_refres` - 1 must
+        occur at least once.  Not used if `refatm_only` is ``True``.
+    selres_ix : numpy.ndarray
+        Residue index of each selection atom.  Must be smaller than
+        `n_selres`.
+    selresindex_ix : numpy.ndarray
+        Index of the residue each selection atom actually belongs to.
+        Only used to count the number of different selection residues
+        in contact with a reference atom.  Must be smaller than
+        `n_selresindices`.
+    n_refatm, n_refres, n_selatm, n_selres, n_selresindices : int
+        Number of reference atoms, reference residues, selection atoms,
+        selection residues and actual selection residues.
+    expected_max_contacts : int, optional
+        Minimum length of the returned histograms.
+    refatm_only : bool, optional
+        If ``True``, only calculate the reference-atom histograms and
+        return ``None`` instead of the reference-residue histograms.
+    
+    Returns
+    -------
+    hists : tuple
+        The eleven histograms returned by :func:`contact_hist`.  All
+        returned histograms have the same length.  If `refatm_only` is
+        ``True``, this length is bounded by the maximum number of
+        selection atoms in contact with a single reference atom instead
+        of a single reference residue.  Hence, the histograms may be
+        shorter than without `refatm_only`, but they only lack trailing
+        zeros.
+    """
+    if len(ref_ix) == 0:
+        # No contacts at all.  All reference atoms and residues fall
+        # into the zeroth bin and there are no pairs to bin, so the
+        # whole binning machinery below can be skipped.
+        hists = [np.zeros(expected_max_contacts, dtype=np.uint32)
+                 for i in range(11)]
+        for i in range(3):
+            hists[i][0] = n_refatm
+        for i in range(3, 8):
+            hists[i][0] = n_refres
+        if refatm_only:
+            for i in (3, 4, 5, 6, 7, 9, 10):
+                hists[i] = None
+        return tuple(hists)
+    
+    refatm_n_selatms = np.bincount(ref_ix, minlength=n_refatm)
+    if refatm_only:
+        refres_n_selatms = refatm_n_selatms
+    else:
+        refres_n_selatms = np.bincount(refres_ix[ref_ix],
+                                       minlength=n_refres)
+    # No histogram can be longer than the maximum number of selection
+    # atoms in contact with a single reference residue plus one.  Thus,
+    # all histograms can be created with their final common length at
+    # once.  If only the reference-atom histograms are calculated, the
+    # maximum number of selection atoms in contact with a single
+    # reference atom is a sufficient bound.
+    length = max(expected_max_contacts,
+                 np.max(refres_n_selatms, initial=0) + 1)
+    
+    # refatm_selatm
+    refatm_selatm = _bincount_uint32(refatm_n_selatms, length)
+    del refatm_n_selatms
+    # If all selection (reference) residues consist of only one atom,
+    # the selection (reference) residues are the same as the selection
+    # (reference) atoms and the residue histograms can be derived from
+    # the atom histograms.
+    sel_single = n_selres == n_selatm
+    ref_single = not refatm_only and n_refres == n_refatm
+    # Atom-atom pairs are always connected via exactly one bond.
+    refatm_selatm_pair = np.zeros(length, dtype=np.uint32)
+    refatm_same_selatm = np.zeros(length, dtype=np.uint32)
+    refatm_same_selatm[0] = refatm_selatm[0]
+    refatm_selatm_pair[1] = len(ref_ix)
+    refatm_same_selatm[1] = n_refatm - refatm_selatm[0]
+    # Each atom pair is one bond.  Bonds between the same pair of
+    # compounds are summed up when converting the sparse COO matrices
+    # below to CSR format.  No pair of compounds can have more bonds
+    # than `length` - 1, so the smallest unsigned integer type that
+    # can hold this number is sufficient and saves memory bandwidth.
+    bonds = np.ones(len(ref_ix), dtype=np.min_scalar_type(length-1))
+    if sel_single:
+        refatm_diff_selres = refatm_selatm.copy()
+        refatm_same_selres = refatm_same_selatm.copy()
+        refatm_selres_pair = refatm_selatm_pair.copy()
+    else:
+        # refatm_diff_selres
+        refatm_selres = sparse.coo_matrix(
+            (bonds, (ref_ix, selresindex_ix[sel_ix])),
+            shape=(n_refatm, n_selresindices)
+        ).tocsr()
+        refatm_selres.sum_duplicates()
+        refatm_diff_selres = _bincount_uint32(
+            np.diff(refatm_selres.indptr), length
+        )
+        # refatm_same_selres and refatm_selres_pair
+        refatm_selres = sparse.coo_matrix(
+            (bonds, (ref_ix, selres_ix[sel_ix])),
+            shape=(n_refatm, n_selres)
+        ).tocsr()
+        refatm_selres.sum_duplicates()
+        refatm_selres_pair = _bincount_uint32(refatm_selres.data, length)
+        refatm_same_selres = _hist_same_bonds(
+            rows=np.repeat(np.arange(n_refatm),
+                           np.diff(refatm_selres.indptr)),
+            bonds=refatm_selres.data,
+            minlength=length
+        )
+        refatm_same_selres[0] = refatm_selatm[0]
+        del refatm_selres
+    if refatm_only:
+        return (refatm_selatm,
+                refatm_diff_selres,
+                refatm_same_selres,
+                None,
+                None,
+                None,
+                None,
+                None,
+                refatm_selres_pair,
+                None,
+                None)
+    
+    if ref_single:
+        refres_diff_selatm = refatm_selatm.copy()
+        refres_same_selatm = refatm_same_selatm.copy()
+        refres_selatm_tot = refatm_selatm.copy()
+        refres_diff_selres = refatm_diff_selres.copy()
+        refres_same_selres = refatm_same_selres.copy()
+        refres_selatm_pair = refatm_selatm_pair.copy()
+        refres_selres_pair = refatm_selres_pair.copy()
+        return (refatm_selatm,
+                refatm_diff_selres,
+                refatm_same_selres,
+                refres_diff_selatm,
+                refres_same_selatm,
+                refres_selatm_tot,
+                refres_diff_selres,
+                refres_same_selres,
+                refatm_selres_pair,
+                refres_selatm_pair,
+                refres_selres_pair)
+    
+    # The refres-selatm and refres-selres matrices holding the number of
+    # bonds of each pair are sparse, because most pairs are not in
+    # contact.  Duplicate entries are summed up when converting to CSR
+    # format.  Unless the selection residues are the same as the
+    # selection atoms, both matrices are stacked on top of each other,
+    # so that all refres histograms are computed in one pass.
+    n_mats = 1 if sel_single else 2
+    if sel_single:
+        refres_sel = sparse.coo_matrix(
+            (bonds, (refres_ix[ref_ix], sel_ix)),
+            shape=(n_refres, n_selatm)
+        ).tocsr()
+    else:
+        refres_sel = sparse.coo_matrix(
+            (np.concatenate([bonds, bonds]),
+             (np.concatenate([refres_ix[ref_ix],
+                              refres_ix[ref_ix] + n_refres]),
+              np.concatenate([sel_ix, selres_ix[sel_ix]]))),
+            shape=(n_mats * n_refres, max(n_selatm, n_selres))
+        ).tocsr()
+    del bonds
+    refres_sel.sum_duplicates()
+    refres_diff_sel = np.diff(refres_sel.indptr)
+    # refres_same_selatm and refres_same_selres
+    refres_same_sel = _hist_same_bonds(
+        rows=np.repeat(np.arange(n_mats * n_refres), refres_diff_sel),
+        bonds=refres_sel.data,
+        minlength=length,
+        n_rows=n_refres,
+        n_mats=n_mats
+    )
+    refres_diff_sel = refres_diff_sel.reshape(n_mats, n_refres)
+    refres_same_sel[:, 0] = (n_refres -
+                             np.count_nonzero(refres_diff_sel, axis=1))
+    # refres_selatm_pair and refres_selres_pair
+    refres_sel_pair = _bincount_uint32(
+        refres_sel.data,
+        length,
+        mats=np.repeat(np.arange(n_mats), refres_diff_sel.sum(axis=1)),
+        n_mats=n_mats,
+        zero_first=True
+    )
+    del refres_sel
+    # refres_diff_selatm and refres_diff_selres
+    refres_diff_sel = _bincount_uint32(
+        refres_diff_sel,
+        length,
+        mats=np.arange(n_mats)[:, np.newaxis],
+        n_mats=n_mats
+    )
+    refres_diff_selatm, refres_diff_selres = refres_diff_sel[[0, -1]]
+    refres_same_selatm, refres_same_selres = refres_same_sel[[0, -1]]
+    refres_selatm_pair, refres_selres_pair = refres_sel_pair[[0, -1]]
+    del refres_diff_sel, refres_same_sel, refres_sel_pair
+    # refres_selatm_tot
+    refres_selatm_tot = _bincount_uint32(refres_n_selatms, length)
+    del refres_n_selatms
+    
+    return (refatm_selatm,
+            refatm_diff_selres,
+            refatm_same_selres,
+            refres_diff_selatm,
+            refres_same_selatm,
+            refres_selatm_tot,
+            refres_diff_selres,
+            refres_same_selres,
+            refatm_selres_pair,
+            refres_selatm_pair,
+            refres_selres_pair)
+
+
+def _contact_pairs(ref_pos, sel_pos, cutoff, box=None, workers=1):
+    """
+    Find all pairs of reference and selection atoms that are within the
+    given cutoff.
+    
+    Parameters
+    ----------
+    ref_pos, sel_pos : numpy.ndarray
+        Positions of the reference and selection atoms as arrays of
+        shape ``(n, 3)``.
+    cutoff : scalar
+        Cutoff distance.
+    box : array_like, optional
+        The unit cell dimensions of the system in the format
+        ``[lx, ly, lz, alpha, beta, gamma]``.  If ``None`` or if all
+        lengths are zero, periodic boundary conditions are not taken
+        into account.
+    workers : int, optional
+        Number of threads to use for the neighbor search.  If ``-1``,
+        all available CPUs are used.  Only has an effect if the
+        simulation box is orthorhombic or if there is no box at all.
+    
+    Returns
+    -------
+    ref_ix, sel_ix : numpy.ndarray
+        Indices of the reference and selection atoms of each pair.
+    
+    Notes
+    -----
+    For orthorhombic boxes (and in the absence of a box) the pairs are
+    found with :class:`scipy.spatial.cKDTree`.  The tree of the selection
+    atoms is built only once per call.  If `workers` is one, a second
+    tree is built for the reference atoms and all pairs are found in a
+    single dual-tree traversal.  Otherwise, the tree of the selection
+    atoms is queried with all reference atoms.  The queries for
+    different reference atoms are independent of each other and are
+    distributed over `workers` threads.  For triclinic boxes,
+    :func:`MDAnalysis.lib.distances.capped_distance` is used.
+    """
+    if box is None or np.all(np.asarray(box)[:3] <= 0):
+        boxsize = None
+    elif np.allclose(box[3:], 90):
+        boxsize = box[:3]
+    else:
+        pairs = mdadist.capped_distance(ref_pos,
+                                        sel_pos,
+                                        max_cutoff=cutoff,
+                                        box=box,
+                                        return_distances=False)
+        return pairs[:, 0], pairs[:, 1]
+    if boxsize is None:
+        tree = cKDTree(sel_pos)
+    else:
+        tree = cKDTree(mdadist.apply_PBC(sel_pos, box), boxsize=boxsize)
+    if workers == 1:
+        if boxsize is None:
+            ref_tree = cKDTree(ref_pos)
+        else:
+            ref_tree = cKDTree(mdadist.apply_PBC(ref_pos, box),
+                               boxsize=boxsize)
+        pairs = ref_tree.sparse_distance_matrix(
+            tree, max_distance=cutoff, output_type='ndarray'
+        )
+        return pairs['i'].astype(np.intp), pairs['j'].astype(np.intp)
+    neighbors = tree.query_ball_point(ref_pos,
+                                      r=cutoff,
+                                      workers=workers,
+                                      return_sorted=False)
+    n_neighbors = np.fromiter(map(len, neighbors),
+                              dtype=np.intp,
+                              count=len(neighbors))
+    ref_ix = np.repeat(np.arange(len(ref_pos)), n_neighbors)
+    sel_ix = np.fromiter(chain.from_iterable(neighbors),
+                         dtype=np.intp,
+                         count=len(ref_ix))
+    return ref_ix, sel_ix
+
+
+def _residue_maps(ref, sel):
+    """
+    Map the atoms of the reference and selection group to their
+    residues.
+    
+    Parameters
+    ----------
+    ref, sel : MDAnalysis.core.groups.AtomGroup instance
+        Reference and selection group.
+    
+    Returns
+    -------
+    refres_ix : numpy.ndarray
+        Index of the residue each reference atom belongs to.
+    n_refres : int
+        Number of residues in the reference group.
+    selres_ix : numpy.ndarray
+        Index of the resid of each selection atom.
+    n_selresids : int
+        Number of different resids in the selection group.
+    selresindex_ix : numpy.ndarray
+        Index of the residue each selection atom belongs to.
+    n_selresindices : int
+        Number of different residues in the selection group.
+    
+    Notes
+    -----
+    The mappings only depend on the topology.  If the atoms contained
+    in `ref` and `sel` do not change, they can be computed once and
+    reused for all frames (see the `res_maps` argument of
+    :func:`contact_hist`).
+    """
+    refres_ix, n_refres = _compact_ix(ref.resindices)
+    selres_ix, n_selresids = _compact_ix(sel.resids)
+    selresindex_ix, n_selresindices = _compact_ix(sel.resindices)
+    return (refres_ix,
+            n_refres,
+            selres_ix,
+            n_selresids,
+            selresindex_ix,
+            n_selresindices)
+
+
+def _contact_hist_arrays(
+        ref_pos, sel_pos, cutoff, res_maps, box=None,
+        expected_max_contacts=16, workers=1, refatm_only=False):
+    """
+    Calculate the contact histograms of :func:`contact_hist` from plain
+    arrays.
+    
+    Parameters
+    ----------
+    ref_pos, sel_pos : numpy.ndarray
+        Positions of the reference and selection atoms as arrays of
+        shape ``(n, 3)``.  Both arrays must not be empty.
+    cutoff : scalar
+        Cutoff distance.  Must be positive.
+    res_maps : tuple
+        The mappings of reference and selection atoms to their residues
+        as returned by :func:`_residue_maps`.
+    box : array_like, optional
+        The unit cell dimensions of the system.  See
+        :func:`_contact_pairs`.
+    expected_max_contacts, workers, refatm_only : optional
+        See :func:`contact_hist`.
+    
+    Returns
+    -------
+    hists : tuple
+        The eleven histograms returned by :func:`contact_hist`.
+    
+    Notes
+    -----
+    This function works entirely on NumPy arrays and does not touch any
+    MDAnalysis object.  :func:`contact_hist` is a thin wrapper around
+    it.
+    """
+    (refres_ix,
+     n_refres,
+     selres_ix,
+     n_selresids,
+     selresindex_ix,
+     n_selresindices) = res_maps
+    # Search all reference-selection atom pairs that are within the
+    # cutoff at once instead of doing one neighbor search per reference
+    # atom.  `ref_ix` and `sel_ix` are the indices of the paired atoms
+    # in `ref_pos` and `sel_pos`.
+    ref_ix, sel_ix = _contact_pairs(ref_pos,
+                                    sel_pos,
+                                    cutoff,
+                                    box=box,
+                                    workers=workers)
+    return _contact_hist_kernel(
+        ref_ix=ref_ix,
+        sel_ix=sel_ix,
+        refres_ix=refres_ix,
+        selres_ix=selres_ix,
+        selresindex_ix=selresindex_ix,
+        n_refatm=len(ref_pos),
+        n_refres=n_refres,
+        n_selatm=len(sel_pos),
+        n_selres=n_selresids,
+        n_selresindices=n_selresindices,
+        expected_max_contacts=expected_max_contacts,
+        refatm_only=refatm_only
+    )
+
+
 def contact_hist(
-        ref, sel, cutoff, expected_max_contacts=16, debug=False):
+        ref, sel, cutoff, expected_max_contacts=16, debug=False,
+        workers=1, refatm_only=False, res_maps=None,
+        refres_eq_refatm=None, selres_eq_selatm=None):
     """
     Calculate the number of contacts between two MDAnalysis
     :class:`AtomGroups <AtomGroups<MDAnalysis.core.groups.AtomGroup>`.
     
-    Contacts are counted by looping over all atoms of the reference
-    group (`ref`) and searching for atoms of the selection group (`sel`)
-    that are within the given cutoff.
+    Contacts are counted by searching all pairs of atoms of the
+    reference group (`ref`) and the selection group (`sel`) that are
+    within the given cutoff.
     
     Contacts are binned into histograms according to how many different
     selection atoms/residues have contact with a given reference
@@ -83,6 +634,33 @@ def contact_hist(
         value, `expected_max_contacts` is set to its default value.
     debug : bool, optional
        If ``True``, check the returned histograms for inconsistencies.
+    workers : int, optional
+        Number of threads to use for the neighbor search.  If ``-1``,
+        all available CPUs are used.  See :func:`_contact_pairs` for
+        more details.
+    refatm_only : bool, optional
+        If ``True``, only calculate the histograms that take into
+        account reference atoms (`refatm_selatm`, `refatm_diff_selres`,
+        `refatm_same_selres` and `refatm_selres_pair`) and return
+        ``None`` instead of the reference-residue histograms.  This
+        saves all the bookkeeping on reference residues.  The returned
+        histograms may be shorter than without `refatm_only`, but they
+        only lack trailing zeros.  Ignored if `debug` is ``True``,
+        because the consistency checks need all histograms.
+    res_maps : tuple, optional
+        The mappings of reference and selection atoms to their residues
+        as returned by :func:`_residue_maps`.  If ``None``, they are
+        computed from `ref` and `sel`.  When calling this function for
+        many frames with :class:`AtomGroups
+        <MDAnalysis.core.groups.AtomGroup>` whose atoms do not change,
+        compute the mappings once and pass them here.
+    refres_eq_refatm, selres_eq_selatm : bool, optional
+        Whether each reference/selection residue contains exactly one
+        atom of `ref`/`sel`.  Only used if `debug` is ``True``.  If
+        ``None``, they are determined from `ref` and `sel`.  When
+        calling this function for many frames with :class:`AtomGroups
+        <MDAnalysis.core.groups.AtomGroup>` whose atoms do not change,
+        determine them once and pass them here.
     
     Returns
     -------
@@ -439,418 +1017,335 @@ def contact_hist(
                       .format(cutoff), RuntimeWarning)
     if expected_max_contacts <= 0:
         expected_max_contacts = 16
+    if debug:
+        refatm_only = False
     if ref.n_atoms == 0:
-        return tuple([np.array([0]) for i in range(11)])
-    if sel.n_atoms == 0 or cutoff <= 0:
-        return tuple([np.array([ref.n_atoms]) for i in range(3)] +
-                     [np.array([ref.n_residues]) for i in range(5)] +
-                     [np.array([0]) for i in range(3)])
-    
-    refatm_selatm = np.zeros(expected_max_contacts, dtype=np.uint32)
-    refatm_diff_selres = np.zeros(expected_max_contacts, dtype=np.uint32)
-    refatm_same_selres = np.zeros(expected_max_contacts, dtype=np.uint32)
-    refres_diff_selatm = np.zeros(ref.n_residues, dtype=np.uint32)
-    refres_selatm_tot = np.zeros(ref.n_residues, dtype=np.uint32)
-    refres_diff_selres = np.zeros(ref.n_residues, dtype=np.uint32)
-    refatm_selres_pair = np.zeros(expected_max_contacts, dtype=np.uint32)
-    refres_selatm_pair = np.zeros((ref.n_residues, sel.n_atoms),
-                                  dtype=np.uint32)
-    refres_selres_pair = np.zeros((ref.n_residues, sel.n_residues),
-                                  dtype=np.uint32)
-    selatm_unused = np.ones((ref.n_residues, sel.n_atoms), dtype=bool)
-    selres_unused = np.ones((ref.n_residues, sel.n_residues), dtype=bool)
-    unique_refresids = np.unique(ref.resids)
-    unique_selresids = np.unique(sel.resids)
-    
-    for refatm in ref.atoms:
-        sel_near_ref = mdt.select.atoms_around_point(
-            ag=sel,
-            point=refatm.position,
-            cutoff=cutoff)
-        # refatm_selatm and refatm_diff_selres
-        refatm_selatm = mdt.nph.extend(refatm_selatm,
-                                       sel_near_ref.n_atoms+1)
-        refatm_selatm[sel_near_ref.n_atoms] += 1
-        refatm_diff_selres = mdt.nph.extend(refatm_diff_selres,
-                                            sel_near_ref.n_residues+1)
-        refatm_diff_selres[sel_near_ref.n_residues] += 1
-        # refatm_same_selres and refatm_selres_pair
-        selresids, selresids_counts = np.unique(sel_near_ref.resids,
-                                                return_counts=True)
-        if selresids.size == 0:
-            refatm_same_selres[0] += 1
-        else:
-            selresids_counts_max = np.max(selresids_counts)
-            refatm_same_selres = mdt.nph.extend(refatm_same_selres,
-                                                selresids_counts_max+1)
-            refatm_same_selres[selresids_counts] += 1
-            refatm_selres_pair = mdt.nph.extend(refatm_selres_pair,
-                                                selresids_counts_max+1)
-            np.add.at(refatm_selres_pair, selresids_counts, 1)
-        # refres_selatm_tot
-        refresid = np.searchsorted(unique_refresids, refatm.resid)
-        refres_selatm_tot[refresid] += sel_near_ref.n_atoms
-        # refres_diff_selatm and refres_selatm_pair
-        selatmids = np.intersect1d(sel.ids,
-                                   sel_near_ref.ids,
-                                   assume_unique=True,
-                                   return_indices=True)[1]
-        n_atoms = np.count_nonzero(selatm_unused[refresid][selatmids])
-        selatm_unused[refresid][selatmids] = False
-        refres_diff_selatm[refresid] += n_atoms
-        refres_selatm_pair[refresid][selatmids] += 1
-        # refres_diff_selres and refres_selres_pair
-        selresids = np.intersect1d(unique_selresids,
-                                   selresids,
-                                   assume_unique=True,
-                                   return_indices=True)[1]
-        n_residues = np.count_nonzero(selres_unused[refresid][selresids])
-        selres_unused[refresid][selresids] = False
-        refres_diff_selres[refresid] += n_residues
-        np.add.at(refres_selres_pair[refresid],
-                  selresids,
-                  selresids_counts)
-    del selatm_unused, selres_unused, unique_refresids, unique_selresids
-    del refresid, selatmids, selresids, selresids_counts
-    
-    # refres_same_selatm
-    max_contacts = np.max(refres_selatm_pair) + 1
-    refres_same_selatm = np.zeros(max_contacts, dtype=np.uint32)
-    tmp1 = np.zeros_like(refres_selatm_pair, dtype=bool)
-    tmp2 = np.zeros(ref.n_residues, dtype=bool)
-    for n in range(1, max_contacts):
-        np.equal(refres_selatm_pair, n, out=tmp1)       # refres-selatm pair has n contacts
-        np.any(tmp1, axis=1, out=tmp2)                  # refres has n contacts with any selatm
-        refres_same_selatm[n] = np.count_nonzero(tmp2)  # Number of refres having n contacts with any selatm
-    refres_same_selatm[0] = ref.n_residues
-    refres_same_selatm[0] -= np.count_nonzero(np.any(refres_selatm_pair,
-                                                     axis=1))
-    del tmp1, tmp2
-    # refres_same_selres
-    max_contacts = np.max(refres_selres_pair) + 1
-    refres_same_selres = np.zeros(max_contacts, dtype=np.uint32)
-    tmp1 = np.zeros_like(refres_selres_pair, dtype=bool)
-    tmp2 = np.zeros(ref.n_residues, dtype=bool)
-    for n in range(1, max_contacts):
-        np.equal(refres_selres_pair, n, out=tmp1)       # refres-selres pair has n contacts
-        np.any(tmp1, axis=1, out=tmp2)                  # refres has n contacts with any selres
-        refres_same_selres[n] = np.count_nonzero(tmp2)  # Number of refres having n contacts with any selres
-    refres_same_selres[0] = ref.n_residues
-    refres_same_selres[0] -= np.count_nonzero(np.any(refres_selres_pair,
-                                                     axis=1))
-    del tmp1, tmp2
-    
-    refres_diff_selatm = np.bincount(refres_diff_selatm)
-    refres_diff_selatm = refres_diff_selatm.astype(np.uint32)
-    refres_selatm_tot = np.bincount(refres_selatm_tot)
-    refres_selatm_tot = refres_selatm_tot.astype(np.uint32)
-    refres_diff_selres = np.bincount(refres_diff_selres)
-    refres_diff_selres = refres_diff_selres.astype(np.uint32)
-    refres_selatm_pair = np.bincount(refres_selatm_pair.flat)
-    refres_selatm_pair = refres_selatm_pair.astype(np.uint32)
-    refres_selatm_pair[0] = 0
-    refres_selres_pair = np.bincount(refres_selres_pair.flat)
-    refres_selres_pair = refres_selres_pair.astype(np.uint32)
-    refres_selres_pair[0] = 0
-    
-    length = max(len(refatm_selatm),
-                 len(refatm_diff_selres),
-                 len(refatm_same_selres),
-                 len(refres_diff_selatm),
-                 len(refres_same_selatm),
-                 len(refres_selatm_tot),
-                 len(refres_diff_selres),
-                 len(refres_same_selres),
-                 len(refatm_selres_pair),
-                 len(refres_selatm_pair),
-                 len(refres_selres_pair))
-    refatm_selatm = mdt.nph.extend(refatm_selatm, length)
-    refatm_diff_selres = mdt.nph.extend(refatm_diff_selres, length)
-    refatm_same_selres = mdt.nph.extend(refatm_same_selres, length)
-    refres_diff_selatm = mdt.nph.extend(refres_diff_selatm, length)
-    refres_same_selatm = mdt.nph.extend(refres_same_selatm, length)
-    refres_selatm_tot = mdt.nph.extend(refres_selatm_tot, length)
-    refres_diff_selres = mdt.nph.extend(refres_diff_selres, length)
-    refres_same_selres = mdt.nph.extend(refres_same_selres, length)
-    refatm_selres_pair = mdt.nph.extend(refatm_selres_pair, length)
-    refres_selatm_pair = mdt.nph.extend(refres_selatm_pair, length)
-    refres_selres_pair = mdt.nph.extend(refres_selres_pair, length)
+        hists = [np.array([0], dtype=np.uint32) for i in range(11)]
+    elif sel.n_atoms == 0 or cutoff <= 0:
+        hists = ([np.array([ref.n_atoms], dtype=np.uint32)
+                  for i in range(3)] +
+                 [np.array([ref.n_residues], dtype=np.uint32)
+                  for i in range(5)] +
+                 [np.array([0], dtype=np.uint32) for i in range(3)])
+    else:
+        hists = None
+    if hists is not None:
+        if refatm_only:
+            for i in (3, 4, 5, 6, 7, 9, 10):
+                hists[i] = None
+        return tuple(hists)
     
-    if debug:
-        if np.sum(refatm_selatm) != ref.n_atoms:
-            raise ValueError("The sum over 'refatm_selatm' ({}) is not"
-                             " equal to the number of reference atoms"
-                             " ({})".format(np.sum(refatm_selatm),
-                                            ref.n_atoms))
-        if np.sum(refatm_diff_selres) != ref.n_atoms:
-            raise ValueError("The sum over 'refatm_diff_selres' ({}) is"
-                             " not equal to the number of reference"
+    # Residue indices of the reference and selection atoms.  Reference
+    # residues are the residues the atoms belong to.  Selection
+    # residues are identified by their resid, but the number of
+    # different selection residues in contact with a reference atom is
+    # counted from the residues of the atoms themselves.
+    if res_maps is None:
+        res_maps = _residue_maps(ref, sel)
+    hists = _contact_hist_arrays(
+        ref_pos=ref.positions,
+        sel_pos=sel.positions,
+        cutoff=cutoff,
+        res_maps=res_maps,
+        box=sel.dimensions,
+        expected_max_contacts=expected_max_contacts,
+        workers=workers,
+        refatm_only=refatm_only
+    )
+    del res_maps
+    if not debug:
+        return hists
+    
+    (refatm_selatm,
+     refatm_diff_selres,
+     refatm_same_selres,
+     refres_diff_selatm,
+     refres_same_selatm,
+     refres_selatm_tot,
+     refres_diff_selres,
+     refres_same_selres,
+     refatm_selres_pair,
+     refres_selatm_pair,
+     refres_selres_pair) = hists
+    
+    names = ('refatm_selatm',
+             'refatm_diff_selres',
+             'refatm_same_selres',
+             'refres_diff_selatm',
+             'refres_same_selatm',
+             'refres_selatm_tot',
+             'refres_diff_selres',
+             'refres_same_selres',
+             'refatm_selres_pair',
+             'refres_selatm_pair',
+             'refres_selres_pair')
+    shapes = [hist.shape for hist in hists]
+    if shapes.count(shapes[0]) != len(shapes):
+        raise ValueError("The histograms have not the same shape:\n" +
+                         "\n".join("  {}.shape = {}".format(name, shape)
+                                   for name, shape in zip(names, shapes)))
+    # Compute the sums and maxima of all histograms at once instead of
+    # calling a NumPy function on each histogram separately.
+    sums = np.sum(hists, axis=1)
+    maxs = np.max(hists, axis=1)
+    
+    if sums[0] != ref.n_atoms:
+        raise ValueError("The sum over 'refatm_selatm' ({}) is not"
+                         " equal to the number of reference atoms"
+                         " ({})".format(sums[0], ref.n_atoms))
+    if sums[1] != ref.n_atoms:
+        raise ValueError("The sum over 'refatm_diff_selres' ({}) is"
+                         " not equal to the number of reference"
+                         " atoms ({})"
+                         .format(sums[1], ref.n_atoms))
+    if sums[2] < ref.n_atoms:
+        raise ValueError("The sum over 'refatm_same_selres' ({}) is"
+                         " less than the number of reference atoms"
+                         " ({})".format(sums[2], ref.n_atoms))
+    if maxs[2] > ref.n_atoms:
+        raise ValueError("At least one element of"
+                         " 'refatm_same_selres' is greater than the"
+                         " number of reference atoms ({})"
+                         .format(ref.n_atoms))
+    if sums[3] != ref.n_residues:
+        raise ValueError("The sum over 'refres_diff_selatm' ({}) is"
+                         " not equal to the number of reference"
+                         " residues ({})"
+                         .format(sums[3], ref.n_residues))
+    if sums[4] < ref.n_residues:
+        raise ValueError("The sum over 'refres_same_selatm' ({}) is"
+                         " less than the number of reference"
+                         " residues ({})"
+                         .format(sums[4], ref.n_residues))
+    if maxs[4] > ref.n_residues:
+        raise ValueError("At least one element of"
+                         " 'refres_same_selatm' is greater than the"
+                         " number of reference residues ({})"
+                         .format(ref.n_residues))
+    if sums[5] != ref.n_residues:
+        raise ValueError("The sum over 'refres_selatm_tot' ({}) is"
+                         " not equal to the number of reference"
+                         " residues ({})"
+                         .format(sums[5], ref.n_residues))
+    if sums[6] != ref.n_residues:
+        raise ValueError("The sum over 'refres_diff_selres' ({}) is"
+                         " not equal to the number of reference"
+                         " residues ({})"
+                         .format(sums[6], ref.n_residues))
+    if sums[7] < ref.n_residues:
+        raise ValueError("The sum over 'refres_same_selres' ({}) is"
+                         " less than the number of reference"
+                         " residues ({})"
+                         .format(sums[7], ref.n_residues))
+    if maxs[7] > ref.n_residues:
+        raise ValueError("At least one element of"
+                         " 'refres_same_selres' is greater than the"
+                         " number of reference residues ({})"
+                         .format(ref.n_residues))
+    
+    if refatm_diff_selres[0] != refatm_selatm[0]:
+        raise ValueError("The number of ref atoms having no contact"
+                         " with any sel atom is not the same in"
+                         " 'refatm_diff_selres' ({}) and"
+                         " 'refatm_selatm' ({})"
+                         .format(refatm_diff_selres[0],
+                                 refatm_selatm[0]))
+    if refatm_same_selres[0] != refatm_selatm[0]:
+        raise ValueError("The number of ref atoms having no contact"
+                         " with any sel atom is not the same in"
+                         " 'refatm_same_selres' ({}) and"
+                         " 'refatm_selatm' ({})"
+                         .format(refatm_same_selres[0],
+                                 refatm_selatm[0]))
+    if refres_same_selatm[0] != refres_diff_selatm[0]:
+        raise ValueError("The number of ref residues having no"
+                         " contact with any sel atom is not the"
+                         " same in 'refres_same_selatm' ({}) and"
+                         " 'refres_diff_selatm' ({})"
+                         .format(refres_same_selatm[0],
+                                 refres_diff_selatm[0]))
+    if refres_selatm_tot[0] != refres_diff_selatm[0]:
+        raise ValueError("The number of ref residues having no"
+                         " contact with any sel atom is not the"
+                         " same in 'refres_selatm_tot' ({}) and"
+                         " 'refres_diff_selatm' ({})"
+                         .format(refres_selatm_tot[0],
+                                 refres_diff_selatm[0]))
+    if refres_diff_selres[0] != refres_diff_selatm[0]:
+        raise ValueError("The number of ref residues having no"
+                         " contact with any sel atom is not the"
+                         " same in 'refres_diff_selres' ({}) and"
+                         " 'refres_diff_selatm' ({})"
+                         .format(refres_diff_selres[0],
+                                 refres_diff_selatm[0]))
+    if refres_same_selres[0] != refres_diff_selatm[0]:
+        raise ValueError("The number of ref residues having no"
+                         " contact with any sel atom is not the"
+                         " same in 'refres_same_selres' ({}) and"
+                         " 'refres_diff_selatm' ({})"
+                         .format(refres_same_selres[0],
+                                 refres_diff_selatm[0]))
+    if refatm_selres_pair[0] != 0:
+        raise ValueError("The first element of 'refatm_selres_pair'"
+                         " ({}) is not zero"
+                         .format(refatm_selres_pair[0]))
+    if refres_selatm_pair[0] != 0:
+        raise ValueError("The first element of 'refres_selatm_pair'"
+                         " ({}) is not zero"
+                         .format(refres_selatm_pair[0]))
+    if refres_selres_pair[0] != 0:
+        raise ValueError("The first element of 'refres_selres_pair'"
+                         " ({}) is not zero"
+                         .format(refres_selres_pair[0]))
+    
+    refatm_selatm_tot_contacts = (refatm_selatm @
+                                  np.arange(len(refatm_selatm)))
+    if refres_eq_refatm is None:
+        # Every residue of an AtomGroup contains at least one of its
+        # atoms.
+        refres_eq_refatm = ref.n_residues == ref.n_atoms
+    if refres_eq_refatm:
+        # refres == refatm
+        # * refatm_selatm == refatm_diff_selatm == refatm_selatm_tot == refatm_selres_tot
+        #                    refres_diff_selatm    refres_selatm_tot == refres_selres_tot
+        # * refatm_same_selatm == [x, Nrefatm-x]
+        #   refres_same_selatm
+        # * refatm_diff_selres
+        #   refres_diff_selres
+        # * refatm_same_selres
+        #   refres_same_selres
+        # * refatm_selatm_pair == [0, y]
+        #   refres_selatm_pair
+        # * refatm_selres_pair
+        #   refres_selres_pair
+        if np.any(refres_diff_selatm != refatm_selatm):
+            raise ValueError("refres = refatm, but"
+                             " 'refres_diff_selatm'"
+                             " != 'refatm_selatm'")
+        if np.any(refres_selatm_tot != refatm_selatm):
+            raise ValueError("refres = refatm, but "
+                             " 'refres_selatm_tot'"
+                             " != 'refatm_selatm'")
+        if np.any(refres_same_selatm[:2] !=
+                  np.array([refatm_selatm[0],
+                            ref.n_atoms-refatm_selatm[0]])):
+            raise ValueError("refres = refatm, but"
+                             " 'refres_same_selatm' !="
+                             " [x, Nrefatm-x]")
+        if sums[4] != ref.n_atoms:
+            raise ValueError("refres = refatm, but the sum over"
+                             " 'refres_same_selatm' ({}) is not"
+                             " equal to the number of reference"
                              " atoms ({})"
-                             .format(np.sum(refatm_diff_selres),
-                                     ref.n_atoms))
-        if np.sum(refatm_same_selres) < ref.n_atoms:
-            raise ValueError("The sum over 'refatm_same_selres' ({}) is"
-                             " less than the number of reference atoms"
-                             " ({})".format(np.sum(refatm_same_selres),
-                                            ref.n_atoms))
-        if np.any(refatm_same_selres > ref.n_atoms):
-            raise ValueError("At least one element of"
-                             " 'refatm_same_selres' is greater than the"
-                             " number of reference atoms ({})"
-                             .format(ref.n_atoms))
-        if np.sum(refres_diff_selatm) != ref.n_residues:
-            raise ValueError("The sum over 'refres_diff_selatm' ({}) is"
-                             " not equal to the number of reference"
-                             " residues ({})"
-                             .format(np.sum(refres_diff_selatm),
-                                     ref.n_residues))
-        if np.sum(refres_same_selatm) < ref.n_residues:
-            raise ValueError("The sum over 'refres_same_selatm' ({}) is"
-                             " less than the number of reference"
-                             " residues ({})"
-                             .format(np.sum(refres_same_selatm),
-                                     ref.n_residues))
-        if np.any(refres_same_selatm > ref.n_residues):
-            raise ValueError("At least one element of"
-                             " 'refres_same_selatm' is greater than the"
-                             " number of reference residues ({})"
-                             .format(ref.n_residues))
-        if np.sum(refres_selatm_tot) != ref.n_residues:
-            raise ValueError("The sum over 'refres_selatm_tot' ({}) is"
-                             " not equal to the number of reference"
-                             " residues ({})"
-                             .format(np.sum(refres_selatm_tot),
-                                     ref.n_residues))
-        if np.sum(refres_diff_selres) != ref.n_residues:
-            raise ValueError("The sum over 'refres_diff_selres' ({}) is"
-                             " not equal to the number of reference"
-                             " residues ({})"
-                             .format(np.sum(refres_diff_selres),
-                                     ref.n_residues))
-        if np.sum(refres_same_selres) < ref.n_residues:
-            raise ValueError("The sum over 'refres_same_selres' ({}) is"
-                             " less than the number of reference"
-                             " residues ({})"
-                             .format(np.sum(refres_same_selres),
-                                     ref.n_residues))
-        if np.any(refres_same_selres > ref.n_residues):
-            raise ValueError("At least one element of"
-                             " 'refres_same_selres' is greater than the"
-                             " number of reference residues ({})"
-                             .format(ref.n_residues))
-        
-        if refatm_diff_selres[0] != refatm_selatm[0]:
-            raise ValueError("The number of ref atoms having no contact"
-                             " with any sel atom is not the same in"
-                             " 'refatm_diff_selres' ({}) and"
-                             " 'refatm_selatm' ({})"
-                             .format(refatm_diff_selres[0],
-                                     refatm_selatm[0]))
-        if refatm_same_selres[0] != refatm_selatm[0]:
-            raise ValueError("The number of ref atoms having no contact"
-                             " with any sel atom is not the same in"
-                             " 'refatm_same_selres' ({}) and"
-                             " 'refatm_selatm' ({})"
-                             .format(refatm_same_selres[0],
-                                     refatm_selatm[0]))
-        if refres_same_selatm[0] != refres_diff_selatm[0]:
-            raise ValueError("The number of ref residues having no"
-                             " contact with any sel atom is not the"
-                             " same in 'refres_same_selatm' ({}) and"
-                             " 'refres_diff_selatm' ({})"
-                             .format(refres_same_selatm[0],
-                                     refres_diff_selatm[0]))
-        if refres_selatm_tot[0] != refres_diff_selatm[0]:
-            raise ValueError("The number of ref residues having no"
-                             " contact with any sel atom is not the"
-                             " same in 'refres_selatm_tot' ({}) and"
-                             " 'refres_diff_selatm' ({})"
-                             .format(refres_selatm_tot[0],
-                                     refres_diff_selatm[0]))
-        if refres_diff_selres[0] != refres_diff_selatm[0]:
-            raise ValueError("The number of ref residues having no"
-                             " contact with any sel atom is not the"
-                             " same in 'refres_diff_selres' ({}) and"
-                             " 'refres_diff_selatm' ({})"
-                             .format(refres_diff_selres[0],
-                                     refres_diff_selatm[0]))
-        if refres_same_selres[0] != refres_diff_selatm[0]:
-            raise ValueError("The number of ref residues having no"
-                             " contact with any sel atom is not the"
-                             " same in 'refres_same_selres' ({}) and"
-                             " 'refres_diff_selatm' ({})"
-                             .format(refres_same_selres[0],
-                                     refres_diff_selatm[0]))
-        if refatm_selres_pair[0] != 0:
-            raise ValueError("The first element of 'refatm_selres_pair'"
-                             " ({}) is not zero"
-                             .format(refatm_selres_pair[0]))
-        if refres_selatm_pair[0] != 0:
-            raise ValueError("The first element of 'refres_selatm_pair'"
-                             " ({}) is not zero"
-                             .format(refres_selatm_pair[0]))
-        if refres_selres_pair[0] != 0:
-            raise ValueError("The first element of 'refres_selres_pair'"
-                             " ({}) is not zero"
-                             .format(refres_selres_pair[0]))
-        
-        refatm_selatm_tot_contacts = np.sum(
-            refatm_selatm * np.arange(len(refatm_selatm))
-        )
-        _, natms_per_refres = np.unique(ref.resindices,
-                                        return_counts=True)
-        if np.all(natms_per_refres == 1):
-            # refres == refatm
-            # * refatm_selatm == refatm_diff_selatm == refatm_selatm_tot == refatm_selres_tot
-            #                    refres_diff_selatm    refres_selatm_tot == refres_selres_tot
-            # * refatm_same_selatm == [x, Nrefatm-x]
-            #   refres_same_selatm
-            # * refatm_diff_selres
-            #   refres_diff_selres
-            # * refatm_same_selres
-            #   refres_same_selres
-            # * refatm_selatm_pair == [0, y]
-            #   refres_selatm_pair
-            # * refatm_selres_pair
-            #   refres_selres_pair
-            if np.any(refres_diff_selatm != refatm_selatm):
-                raise ValueError("refres = refatm, but"
-                                 " 'refres_diff_selatm'"
-                                 " != 'refatm_selatm'")
-            if np.any(refres_selatm_tot != refatm_selatm):
-                raise ValueError("refres = refatm, but "
-                                 " 'refres_selatm_tot'"
-                                 " != 'refatm_selatm'")
-            if np.any(refres_same_selatm[:2] !=
-                      np.array([refatm_selatm[0],
-                                ref.n_atoms-refatm_selatm[0]])):
-                raise ValueError("refres = refatm, but"
-                                 " 'refres_same_selatm' !="
-                                 " [x, Nrefatm-x]")
-            if np.sum(refres_same_selatm) != ref.n_atoms:
-                raise ValueError("refres = refatm, but the sum over"
-                                 " 'refres_same_selatm' ({}) is not"
-                                 " equal to the number of reference"
-                                 " atoms ({})"
-                                 .format(np.sum(refres_same_selatm),
-                                         ref.n_atoms))
-            if np.any(refres_diff_selres != refatm_diff_selres):
-                raise ValueError("refres = refatm, but"
-                                 " 'refres_diff_selres' !="
-                                 " 'refatm_diff_selres'")
-            if np.any(refres_same_selres != refatm_same_selres):
-                raise ValueError("refres = refatm, but"
-                                 " 'refres_same_selres' !="
-                                 " 'refatm_same_selres'")
-            if np.any(np.delete(refres_selatm_pair, 1) != 0):
-                raise ValueError("refres = refatm, but"
-                                 " 'refres_selatm_pair' != [0, y]")
-            if refres_selatm_pair[1] != refatm_selatm_tot_contacts:
-                raise ValueError("refres = refatm, but"
-                                 " 'refres_selatm_pair' != [0, y]")
-            if np.any(refres_selres_pair != refatm_selres_pair):
-                raise ValueError("refres = refatm, but"
-                                 " 'refres_selres_pair' !="
-                                 " 'refatm_selres_pair'")
-        
-        _, natms_per_selres = np.unique(sel.resindices,
-                                        return_counts=True)
-        if np.all(natms_per_selres == 1):
-            # selres == selatm
-            # * refatm_selatm == refatm_diff_selatm == refatm_selatm_tot == refatm_selres_tot
-            #                    refatm_diff_selres
-            # * refatm_same_selatm == [x, Nrefatm-x]
-            #   refatm_same_selres
-            # * refres_diff_selatm
-            #   refres_diff_selres
-            # * refres_same_selatm
-            #   refres_same_selres
-            # * refres_selatm_tot == refres_selres_tot
-            # * refatm_selatm_pair == [0, y]
-            #   refatm_selres_pair
-            # * refres_selatm_pair
-            #   refres_selres_pair
-            if np.any(refatm_diff_selres != refatm_selatm):
-                raise ValueError("selres = selatm, but"
-                                 " 'refatm_diff_selres' !="
-                                 " 'refatm_selatm'")
-            if np.any(refatm_same_selres[:2] !=
-                      np.array([refatm_selatm[0],
-                                ref.n_atoms-refatm_selatm[0]])):
-                raise ValueError("selres = selatm, but"
-                                 " 'refatm_same_selres' !="
-                                 " [x, Nrefatm-x]")
-            if np.sum(refatm_same_selres) != ref.n_atoms:
-                raise ValueError("selres = selatm, but the sum over"
-                                 " 'refatm_same_selres' ({}) is not"
-                                 " equal to the number of reference"
-                                 " atoms ({})"
-                                 .format(np.sum(refatm_same_selres),
-                                         ref.n_atoms))
-            if np.any(refres_diff_selres != refres_diff_selatm):
-                raise ValueError("selres = selatm, but"
-                                 " 'refres_diff_selres' !="
-                                 " 'refres_diff_selatm'")
-            if np.any(refres_same_selres != refres_same_selatm):
-                raise ValueError("selres = selatm, but"
-                                 " 'refres_same_selres' !="
-                                 " 'refres_same_selatm'")
-            if np.any(np.delete(refatm_selres_pair, 1) != 0):
-                raise ValueError("refres = refatm, but"
-                                 " 'refatm_selres_pair' != [0, y]")
-            if refatm_selres_pair[1] != refatm_selatm_tot_contacts:
-                raise ValueError("refres = refatm, but"
-                                 " 'refatm_selres_pair' != [0, y]")
-            if np.any(refres_selres_pair != refres_selatm_pair):
-                raise ValueError("refres = refatm, but"
-                                 " 'refres_selres_pair' !="
-                                 " 'refres_selatm_pair'")
-        
-        if (refatm_diff_selres.shape != refatm_selatm.shape or
-            refatm_same_selres.shape != refatm_selatm.shape or
-            refres_diff_selatm.shape != refatm_selatm.shape or
-            refres_same_selatm.shape != refatm_selatm.shape or
-            refres_selatm_tot.shape != refatm_selatm.shape or
-            refres_diff_selres.shape != refatm_selatm.shape or
-            refres_same_selres.shape != refatm_selatm.shape or
-            refatm_selres_pair.shape != refatm_selatm.shape or
-            refres_selatm_pair.shape != refatm_selatm.shape or
-            refres_selres_pair.shape != refatm_selatm.shape):
-            raise ValueError("The histograms have not the same shape:\n"
-                             "  refatm_selatm.shape = {}\n"
-                             "  refatm_diff_selres.shape = {}\n"
-                             "  refatm_same_selres.shape = {}\n"
-                             "  refres_diff_selatm.shape = {}\n"
-                             "  refres_same_selatm.shape = {}\n"
-                             "  refres_selatm_tot.shape = {}\n"
-                             "  refres_diff_selres.shape = {}\n"
-                             "  refres_same_selres.shape = {}\n"
-                             "  refatm_selres_pair.shape = {}\n"
-                             "  refres_selatm_pair.shape = {}\n"
-                             "  refres_selres_pair.shape = {}"
-                             .format(refatm_selatm.shape,
-                                     refatm_diff_selres.shape,
-                                     refatm_same_selres.shape,
-                                     refres_diff_selatm.shape,
-                                     refres_same_selatm.shape,
-                                     refres_selatm_tot.shape,
-                                     refres_diff_selres.shape,
-                                     refres_same_selres.shape,
-                                     refatm_selres_pair.shape,
-                                     refres_selatm_pair.shape,
-                                     refres_selres_pair.shape))
+                             .format(sums[4], ref.n_atoms))
+        if np.any(refres_diff_selres != refatm_diff_selres):
+            raise ValueError("refres = refatm, but"
+                             " 'refres_diff_selres' !="
+                             " 'refatm_diff_selres'")
+        if np.any(refres_same_selres != refatm_same_selres):
+            raise ValueError("refres = refatm, but"
+                             " 'refres_same_selres' !="
+                             " 'refatm_same_selres'")
+        if np.any(np.delete(refres_selatm_pair, 1) != 0):
+            raise ValueError("refres = refatm, but"
+                             " 'refres_selatm_pair' != [0, y]")
+        if refres_selatm_pair[1] != refatm_selatm_tot_contacts:
+            raise ValueError("refres = refatm, but"
+                             " 'refres_selatm_pair' != [0, y]")
+        if np.any(refres_selres_pair != refatm_selres_pair):
+            raise ValueError("refres = refatm, but"
+                             " 'refres_selres_pair' !="
+                             " 'refatm_selres_pair'")
     
-    return (refatm_selatm,
-            refatm_diff_selres,
-            refatm_same_selres,
-            refres_diff_selatm,
-            refres_same_selatm,
-            refres_selatm_tot,
-            refres_diff_selres,
-            refres_same_selres,
-            refatm_selres_pair,
-            refres_selatm_pair,
-            refres_selres_pair)
+    if selres_eq_selatm is None:
+        # Every residue of an AtomGroup contains at least one of its
+        # atoms.
+        selres_eq_selatm = sel.n_residues == sel.n_atoms
+    if selres_eq_selatm:
+        # selres == selatm
+        # * refatm_selatm == refatm_diff_selatm == refatm_selatm_tot == refatm_selres_tot
+        #                    refatm_diff_selres
+        # * refatm_same_selatm == [x, Nrefatm-x]
+        #   refatm_same_selres
+        # * refres_diff_selatm
+        #   refres_diff_selres
+        # * refres_same_selatm
+        #   refres_same_selres
+        # * refres_selatm_tot == refres_selres_tot
+        # * refatm_selatm_pair == [0, y]
+        #   refatm_selres_pair
+        # * refres_selatm_pair
+        #   refres_selres_pair
+        if np.any(refatm_diff_selres != refatm_selatm):
+            raise ValueError("selres = selatm, but"
+                             " 'refatm_diff_selres' !="
+                             " 'refatm_selatm'")
+        if np.any(refatm_same_selres[:2] !=
+                  np.array([refatm_selatm[0],
+                            ref.n_atoms-refatm_selatm[0]])):
+            raise ValueError("selres = selatm, but"
+                             " 'refatm_same_selres' !="
+                             " [x, Nrefatm-x]")
+        if sums[2] != ref.n_atoms:
+            raise ValueError("selres = selatm, but the sum over"
+                             " 'refatm_same_selres' ({}) is not"
+                             " equal to the number of reference"
+                             " atoms ({})"
+                             .format(sums[2], ref.n_atoms))
+        if np.any(refres_diff_selres != refres_diff_selatm):
+            raise ValueError("selres = selatm, but"
+                             " 'refres_diff_selres' !="
+                             " 'refres_diff_selatm'")
+        if np.any(refres_same_selres != refres_same_selatm):
+            raise ValueError("selres = selatm, but"
+                             " 'refres_same_selres' !="
+                             " 'refres_same_selatm'")
+        if np.any(np.delete(refatm_selres_pair, 1) != 0):
+            raise ValueError("refres = refatm, but"
+                             " 'refatm_selres_pair' != [0, y]")
+        if refatm_selres_pair[1] != refatm_selatm_tot_contacts:
+            raise ValueError("refres = refatm, but"
+                             " 'refatm_selres_pair' != [0, y]")
+        if np.any(refres_selres_pair != refres_selatm_pair):
+            raise ValueError("refres = refatm, but"
+                             " 'refres_selres_pair' !="
+                             " 'refres_selatm_pair'")
+    
+    return hists
+
+
+def _accumulate_hist(hist, hist_tmp):
+    """
+    Add a histogram to another histogram that is extended if necessary.
+    
+    Parameters
+    ----------
+    hist : numpy.ndarray
+        Two dimensional array containing one histogram per row.
+    hist_tmp : numpy.ndarray
+        Two dimensional array with the same number of rows as `hist`
+        containing the histograms to add to `hist`.
+    
+    Returns
+    -------
+    hist : numpy.ndarray
+        The sum of `hist` and `hist_tmp`.  If `hist_tmp` has not more
+        columns than `hist`, this is the input array `hist` that was
+        modified in place.  Otherwise, it is a new array extended to at
+        least twice the number of columns of `hist`.  The surplus
+        columns are zero.
+    
+    Notes
+    -----
+    The number of columns is at least doubled whenever `hist` must be
+    extended, so that accumulating histograms of steadily increasing
+    length reallocates `hist` only a logarithmic number of times.
+    """
+    n_bins = hist_tmp.shape[1]
+    if n_bins > hist.shape[1]:
+        hist = mdt.nph.extend(hist, max(n_bins, 2*hist.shape[1]))
+    hist[:, :n_bins] += hist_tmp
+    return hist
 
 
 if __name__ == '__main__':
@@ -860,9 +1355,9 @@ if __name__ == '__main__':
     parser = argparse.ArgumentParser(
         description=(
             "Calculate the number of contacts between two atom groups."
-            "  Contacts are counted by looping over all atoms of the"
-            " reference group and searching for atoms of the selection"
-            " group that are within the given cutoff.  Contacts are"
+            "  Contacts are counted by searching all pairs of atoms of"
+            " the reference and selection group that are within the"
+            " given cutoff.  Contacts are"
             " binned according to how many different selection"
             " atoms/residues have contact with a given reference"
             " atom/residue and according to how many contacts exist"
@@ -1011,17 +1506,40 @@ if __name__ == '__main__':
     )
     
     expected_max_contacts = 16  # Will be increased if necessary
-    hist_atm = np.zeros((3, expected_max_contacts), dtype=np.uint32)
-    hist_res = np.zeros((5, expected_max_contacts), dtype=np.uint32)
-    hist_par = np.zeros((3, expected_max_contacts), dtype=np.uint32)
+    # All histograms returned by contact_hist are accumulated in a
+    # single array.  The rows of the atom, residue and pair histograms
+    # are addressed by the following slices.
+    S_ATM = slice(0, 3)
+    S_RES = slice(3, 8)
+    S_PAR = slice(8, 11)
+    hist = np.zeros((11, expected_max_contacts), dtype=np.uint32)
+    # Buffer for the histograms of a single frame.  Grown if necessary.
+    hist_tmp = np.empty_like(hist)
+    # Number of bins actually used.  `hist` and `hist_tmp` can have more
+    # columns, because they are grown geometrically.
+    n_bins_max = expected_max_contacts
     if args.UPDATING_REF:
         n_refatm = 0
         n_refres = 0
     if args.UPDATING_SEL:
         n_selatm = 0
         n_selres = 0
-    n_pairs = np.zeros(hist_par.shape[0], dtype=np.uint32)
-    n_pairs_tmp = np.zeros_like(n_pairs)
+    n_pairs = np.zeros(S_PAR.stop-S_PAR.start, dtype=np.uint32)
+    num_CPUs = mdt.rti.get_num_CPUs()
+    if args.UPDATING_REF or args.UPDATING_SEL:
+        res_maps = None
+    else:
+        # The residue mappings of static groups are the same for all
+        # frames.
+        res_maps = _residue_maps(ref, sel)
+    if args.DEBUG and not args.UPDATING_REF:
+        refres_eq_refatm = ref.n_residues == ref.n_atoms
+    else:
+        refres_eq_refatm = None
+    if args.DEBUG and not args.UPDATING_SEL:
+        selres_eq_selatm = sel.n_residues == sel.n_atoms
+    else:
+        selres_eq_selatm = None
     
     print("\n")
     print("Reading trajectory...")
@@ -1030,6 +1548,7 @@ if __name__ == '__main__':
     print("First frame to read:    {:>8d}".format(BEGIN))
     print("Last frame to read:     {:>8d}".format(END-1))
     print("Read every n-th frame:  {:>8d}".format(EVERY))
+    print("CPUs found:             {:>8d}".format(num_CPUs))
     print("Time first frame:       {:>12.3f} (ps)"
           .format(u.trajectory[BEGIN].time))
     print("Time last frame:        {:>12.3f} (ps)"
@@ -1040,7 +1559,13 @@ if __name__ == '__main__':
           .format(u.trajectory[END-1].dt))
     timer = datetime.now()
     trj = mdt.rti.ProgressBar(u.trajectory[BEGIN:END:EVERY])
-    for ts in trj:
+    for i, ts in enumerate(trj):
+        if i % 256 == 0:
+            # Reading the memory usage is a system call, therefore
+            # update the progress bar only every few frames.
+            progress_bar_mem = proc.memory_info().rss / 2**20
+            trj.set_postfix_str("{:>7.2f}MiB".format(progress_bar_mem),
+                                refresh=False)
         if args.UPDATING_REF:
             n_refatm += ref.n_atoms
             n_refres += ref.n_residues
@@ -1049,27 +1574,27 @@ if __name__ == '__main__':
             n_selres += sel.n_residues
         if ref.n_atoms == 0:
             continue
-        hist_tmp = np.asarray(contact_hist(
+        hists = contact_hist(
             ref=ref,
             sel=sel,
             cutoff=args.CUTOFF,
-            expected_max_contacts=hist_atm.shape[1],
-            debug=args.DEBUG
-        ))
-        hist_atm, hist_atm_tmp = mdt.nph.match_shape(hist_atm,
-                                                     hist_tmp[:3])
-        hist_atm += hist_atm_tmp
-        hist_res, hist_res_tmp = mdt.nph.match_shape(hist_res,
-                                                     hist_tmp[3:8])
-        hist_res += hist_res_tmp
-        hist_par, hist_par_tmp = mdt.nph.match_shape(hist_par,
-                                                     hist_tmp[8:])
-        hist_par += hist_par_tmp
-        np.sum(hist_tmp[8:], axis=1, out=n_pairs_tmp)
-        n_pairs += n_pairs_tmp
-        progress_bar_mem = proc.memory_info().rss / 2**20
-        trj.set_postfix_str("{:>7.2f}MiB".format(progress_bar_mem),
-                            refresh=False)
+            expected_max_contacts=n_bins_max,
+            debug=args.DEBUG,
+            workers=num_CPUs,
+            res_maps=res_maps,
+            refres_eq_refatm=refres_eq_refatm,
+            selres_eq_selatm=selres_eq_selatm
+        )
+        n_bins = len(hists[0])
+        if n_bins > hist_tmp.shape[1]:
+            hist_tmp = np.empty((len(hists),
+                                 max(n_bins, 2*hist_tmp.shape[1])),
+                                dtype=np.uint32)
+        np.stack(hists, out=hist_tmp[:, :n_bins])
+        del hists
+        hist = _accumulate_hist(hist, hist_tmp[:, :n_bins])
+        n_bins_max = max(n_bins_max, n_bins)
+        n_pairs += hist_tmp[S_PAR, :n_bins].sum(axis=1, dtype=np.uint32)
     trj.close()
     print("Elapsed time:         {}".format(datetime.now()-timer))
     print("Current memory usage: {:.2f} MiB"
@@ -1087,161 +1612,159 @@ if __name__ == '__main__':
     if not args.UPDATING_SEL:
         n_selatm = sel.n_atoms * N_FRAMES
         n_selres = sel.n_residues * N_FRAMES
-    hist_atm = hist_atm / n_refatm
-    hist_res = hist_res / n_refres
-    hist_par = hist_par / n_pairs[:,None]
-    
-    av_atm = np.zeros(2, dtype=np.float64)
-    av_atm_bound = np.zeros(2, dtype=np.float64)
-    for i in [0, 1]:  # 0 = refatm_selatm; 1 = refatm_diff_selres
-        # Average refatm-selatm coordination number normalized by the
-        # total number of refatms:
-        av_atm[i] = np.sum(hist_atm[i] * np.arange(len(hist_atm[i])))
-        # Average refatm-selatm coordination number normalized by the
-        # number of refatms that are bound to at least one selatm
-        av_atm_bound[i] = av_atm[i] / (1 - hist_atm[i][0])
-    av_res = np.zeros(4, dtype=np.float64)
-    av_res_bound = np.zeros(4, dtype=np.float64)
-    for i in [0, 2, 3]:  # 0 = refres_diff_selatm; 2 = refres_selatm_tot; 3 = refres_diff_selres
-        av_res[i] = np.sum(hist_res[i] * np.arange(len(hist_res[i])))
-        av_res_bound[i] = av_res[i] / (1 - hist_res[i][0])
-    av_par = np.zeros(3, dtype=np.float64)
-    av_par_bound = np.zeros(3, dtype=np.float64)
-    for i in [0]:  # 0 = refatm_selres_pair
-        # Average number of bonds between refatm-selres pairs normalized
-        # by the number of refatm-selres pairs:
-        av_par_bound[i] = np.sum(hist_par[i] * np.arange(len(hist_par[i])))
-        # Multiplied by the percentage of bound refatms
-        av_par[i] = av_par_bound[i] * (1 - hist_atm[0][0])
-    for i in [1, 2]:  # 1 = refres_selatm_pair; 2 = refres_selres_pair
-        av_par_bound[i] = np.sum(hist_par[i] * np.arange(len(hist_par[i])))
-        av_par[i] = av_par_bound[i] * (1 - hist_res[0][0])
-    
-    last_nonzero = 0
-    if not np.all(hist_atm == 0):
-        last_nonzero = max(last_nonzero, np.max(np.nonzero(hist_atm)[1]))
-    if not np.all(hist_res == 0):
-        last_nonzero = max(last_nonzero, np.max(np.nonzero(hist_res)[1]))
-    if not np.all(hist_par == 0):
-        last_nonzero = max(last_nonzero, np.max(np.nonzero(hist_par)[1]))
+    hist = hist[:, :n_bins_max]
+    hist_atm = hist[S_ATM] / n_refatm
+    hist_res = hist[S_RES] / n_refres
+    # Histograms without any pair remain zero instead of becoming NaN.
+    inv_n_pairs = np.divide(1, n_pairs, out=np.zeros(len(n_pairs)),
+                            where=n_pairs > 0)
+    hist_par = hist[S_PAR] * inv_n_pairs[:,None]
+    del inv_n_pairs
+    del hist
+    
+    # All histograms have the same number of bins.
+    bins = np.arange(hist_atm.shape[1], dtype=np.float64)
+    # Average coordination numbers normalized by the total number of
+    # ref compounds (av_*) and by the number of ref compounds that are
+    # bound to at least one sel compound (av_*_bound).  The averages of
+    # the "same" histograms (av_atm[2], av_res[1] and av_res[4]) are
+    # not used.
+    av_atm = hist_atm @ bins
+    av_atm_bound = av_atm / (1 - hist_atm[:, 0])
+    av_res = hist_res @ bins
+    av_res_bound = av_res / (1 - hist_res[:, 0])
+    # Average number of bonds between ref-sel pairs normalized by the
+    # number of pairs (av_par_bound) and multiplied by the percentage
+    # of bound ref atoms (refatm_selres_pair) or bound ref residues
+    # (refres_selatm_pair and refres_selres_pair) (av_par).
+    av_par_bound = hist_par @ bins
+    av_par = av_par_bound * (1 - np.array([hist_atm[0][0],
+                                           hist_res[0][0],
+                                           hist_res[0][0]]))
+    
+    # Last bin that is non-zero in at least one histogram.
+    nonzero = np.flatnonzero(np.any(hist_atm, axis=0) |
+                             np.any(hist_res, axis=0) |
+                             np.any(hist_par, axis=0))
+    last_nonzero = nonzero[-1] if len(nonzero) > 0 else 0
+    del nonzero
+    # Sum over each histogram.  Used for the output and for the
+    # consistency checks.
+    sums_atm = hist_atm.sum(axis=1)
+    sums_res = hist_res.sum(axis=1)
+    sums_par = hist_par.sum(axis=1)
     
     print("\n")
     print("Creating output...")
     timer = datetime.now()
     mdt.fh.write_header(args.OUTFILE)
+    # Collect the whole output in a list of strings and write it to the
+    # output file with a single call.
+    report = []
+    report.append("# \n")
+    report.append("# \n")
+    report.append("# Reference: '{}'\n".format(' '.join(args.REF)))
+    report.append(mdt.fh.indent(text=mdt.rti.ag_info_str(ag=ref),
+                                amount=1,
+                                char="#   ")
+                  + "\n")
+    report.append("# \n")
+    report.append("# Selection: '{}'\n".format(' '.join(args.SEL)))
+    report.append(mdt.fh.indent(text=mdt.rti.ag_info_str(ag=sel),
+                                amount=1,
+                                char="#   ")
+                  + "\n")
+    report.append("# \n")
+    report.append("# \n")
+    report.append("# Contact histograms\n")
+    report.append("# Cutoff (Angstrom): {}\n".format(args.CUTOFF))
+    report.append("# Statistics:\n")
+    report.append("#   Number of frames:                         {:>9d}\n".format(N_FRAMES))
+    report.append("#   Total number of ref atoms    (per frame): {:>9d}  ({:>9.2f})\n".format(n_refatm, n_refatm/N_FRAMES))
+    report.append("#   Total number of ref residues (per frame): {:>9d}  ({:>9.2f})\n".format(n_refres, n_refres/N_FRAMES))
+    report.append("#   Total number of sel atoms    (per frame): {:>9d}  ({:>9.2f})\n".format(n_selatm, n_selatm/N_FRAMES))
+    report.append("#   Total number of sel residues (per frame): {:>9d}  ({:>9.2f})\n".format(n_selres, n_selres/N_FRAMES))
+    report.append("# \n")
+    report.append("# \n")
+    report.append("# Percentage of ref atoms    connected to at least one sel atom:                    {:10.4e}\n".format(1-hist_atm[0][0]))
+    report.append("# Percentage of ref residues connected to at least one sel atom:                    {:10.4e}\n".format(1-hist_res[0][0]))
+    report.append("#    (2)  Average       sel atom    coordination number of all   ref atoms:         {:10.4e}  (Every ref atom                              has on average           contact  with this many           sel atoms)\n".format(av_atm[0]))
+    report.append("#    (2)* Average       sel atom    coordination number of bound ref atoms:         {:10.4e}  (Every ref atom    connected to sel atoms    has on average           contact  with this many           sel atoms)\n".format(av_atm_bound[0]))
+    report.append("#    (3)  Average       sel residue coordination number of all   ref atoms:         {:10.4e}  (Every ref atom                              has on average           contact  with this many different sel residues)\n".format(av_atm[1]))
+    report.append("#    (3)* Average       sel residue coordination number of bound ref atoms:         {:10.4e}  (Every ref atom    connected to sel residues has on average           contact  with this many different sel residues)\n".format(av_atm_bound[1]))
+    report.append("#    (5)  Average       sel atom    coordination number of all   ref residues:      {:10.4e}  (Every ref residue                           has on average           contact  with this many different sel atoms)\n".format(av_res[0]))
+    report.append("#    (5)* Average       sel atom    coordination number of bound ref residues:      {:10.4e}  (Every ref residue connected to sel atoms    has on average           contact  with this many different sel atoms)\n".format(av_res_bound[0]))
+    report.append("#    (7)  Average total sel atom    coordination number of all   ref residues:      {:10.4e}  (Every ref residue                           has on average this many contacts with                     sel atoms)\n".format(av_res[2]))
+    report.append("#    (7)* Average total sel atom    coordination number of bound ref residues:      {:10.4e}  (Every ref residue connected to sel atoms    has on average this many contacts with                     sel atoms)\n".format(av_res_bound[2]))
+    report.append("#    (8)  Average       sel residue coordination number of all   ref residues:      {:10.4e}  (Every ref residue                           has on average           contact  with this many different sel residues)\n".format(av_res[3]))
+    report.append("#    (8)* Average       sel residue coordination number of bound ref residues:      {:10.4e}  (Every ref residue connected to sel residues has on average           contact  with this many different sel residues)\n".format(av_res_bound[3]))
+    report.append("#   (10)' Average number of 'bonds' ref atoms    establish to the same sel residue: {:10.4e}  (Every ref atom                              has on average this many contacts with           the same  sel residue)\n".format(av_par[0]))
+    report.append("#   (10)  Average number of 'bonds' between ref-atom-   sel-residue pairs:          {:10.4e}  (Every ref atom    connected to sel residues has on average this many contacts with           the same  sel residue)\n".format(av_par_bound[0]))
+    report.append("#   (11)' Average number of 'bonds' ref residues establish to the same sel atom:    {:10.4e}  (Every ref residue                           has on average this many contacts with           the same  sel atom)\n".format(av_par[1]))
+    report.append("#   (11)  Average number of 'bonds' between ref-residue-sel-atom    pairs:          {:10.4e}  (Every ref residue connected to sel atoms    has on average this many contacts with           the same  sel atom)\n".format(av_par_bound[1]))
+    report.append("#   (12)' Average number of 'bonds' ref residues establish to the same sel residue: {:10.4e}  (Every ref residue                           has on average this many contacts with           the same  sel residue)\n".format(av_par[2]))
+    report.append("#   (12)  Average number of 'bonds' between ref-residue-sel-residue pairs:          {:10.4e}  (Every ref residue connected to sel residues has on average this many contacts with           the same  sel residue)\n".format(av_par_bound[2]))
+    report.append("# The average coordination numbers given here are the product sum over all histogram elements of column number (i) times their respective number of contacts N\n")
+    report.append("# *) Additionally divided    by the percentage of bound ref atoms/residues (-> Probabilities are renormalized to the number of bound ref atoms/residues)\n")
+    report.append("# ') Additionally multiplied by the percentage of bound ref atoms/residues (-> Probabilities are renormalized to the number of all   ref atoms/residues)\n")
+    report.append("# \n")
+    report.append("# \n")
+    report.append("# The columns contain:\n")
+    report.append("#    1 N:                  Number of contacts between the reference and selection\n")
+    report.append("#    2 refatm_selatm:      % of ref atoms    that have   contact  with N different sel atoms    (multiple contacts with the same sel atom    discounted) [refatm_diff_selatm]\n")
+    report.append("#                       [= % of ref atoms    that have N contacts with             sel atoms    (multiple contacts with the same sel atom       counted)  refatm_selatm_tot]\n")
+    report.append("#                       [= % of ref atoms    that have N contacts with             sel residues (multiple contacts with the same sel residue    counted)  refatm_selres_tot]\n")
+    report.append("#    3 refatm_diff_selres: % of ref atoms    that have   contact  with N different sel residues (multiple contacts with the same sel residue discounted)\n")
+    report.append("#    4 refatm_same_selres: % of ref atoms    that have N contacts with   the same  sel residue  (multiple contacts with the same sel residue    counted, multiple connections to different sel residues via the same number of contacts discounted)\n")
+    report.append("#    5 refres_diff_selatm: % of ref residues that have   contact  with N different sel atoms    (multiple contacts with the same sel atom    discounted)\n")
+    report.append("#    6 refres_same_selatm: % of ref residues that have N contacts with   the same  sel atom     (multiple contacts with the same sel atom       counted, multiple connections to different sel atoms    via the same number of contacts discounted)\n")
+    report.append("#    7 refres_selatm_tot:  % of ref residues that have N contacts with             sel atoms    (multiple contacts with the same sel atom       counted)\n")
+    report.append("#                       [= % of ref residues that have N contacts with             sel residues (multiple contacts with the same sel residue    counted)  refres_selres_tot]\n")
+    report.append("#    8 refres_diff_selres: % of ref residues that have   contact  with N different sel residues (multiple contacts with the same sel residue discounted)\n")
+    report.append("#    9 refres_same_selres: % of ref residues that have N contacts with   the same  sel residue  (multiple contacts with the same sel residue    counted, multiple connections to different sel residues via the same number of contacts discounted)\n")
+    report.append("#   10 refatm_selres_pair: % of ref-atom    sel-residue pairs connected via N 'bonds'         (first element is meaningless)\n")
+    report.append("#   11 refres_selatm_pair: % of ref-residue sel-atom    pairs connected via N 'bonds'         (first element is meaningless)\n")
+    report.append("#   12 refres_selres_pair: % of ref-residue sel-residue pairs connected via N 'bonds'         (first element is meaningless)\n")
+    report.append("# \n")
+    report.append('# Column number:\n')
+    report.append("# {:3d}   {:16d} {:16d} {:16d}   {:16d} {:16d} {:16d} {:16d} {:16d}   {:16d} {:16d} {:16d}\n"
+                  .format(1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12))
+    report.append("# {:>3s}   {:>16s} {:>16s} {:>16s}   {:>16s} {:>16s} {:>16s} {:>16s} {:>16s}   {:>16s} {:>16s} {:>16s}\n"
+                  .format("N",                 # 01
+                          "refatm_selatm",     # 02
+                          "refatm_d_selres",   # 03
+                          "refatm_s_selres",   # 04
+                          "refres_d_selatm",   # 05
+                          "refres_s_selatm",   # 06
+                          "refres_selatm_t",   # 07
+                          "refres_d_selres",   # 08
+                          "refres_s_selres",   # 09
+                          "refatm_selres_p",   # 10
+                          "refres_selatm_p",   # 11
+                          "refres_selres_p"))  # 12
+    row_fmt = "  {:3d}   {:16.9e} {:16.9e} {:16.9e}   {:16.9e} {:16.9e} {:16.9e} {:16.9e} {:16.9e}   {:16.9e} {:16.9e} {:16.9e}\n"
+    # Stack the columns of the table once and convert them to a nested
+    # list, so that the rows are formatted from Python floats instead
+    # of NumPy scalars created element by element.
+    table = np.column_stack((hist_atm[:, :last_nonzero+1].T,
+                             hist_res[:, :last_nonzero+1].T,
+                             hist_par[:, :last_nonzero+1].T)).tolist()
+    report.extend(row_fmt.format(i, *row)
+                  for i, row in enumerate(table))
+    del table
+    report.append("\n")
+    report.append("\n")
+    report.append("# Sums\n")
+    # The sum over the first column (0, 1, ..., last_nonzero) is an
+    # arithmetic series.
+    sums = np.concatenate((sums_atm, sums_res, sums_par))
+    report.append(row_fmt.format(last_nonzero * (last_nonzero+1) // 2,
+                                 *sums.tolist()))
+    del sums
     with open(args.OUTFILE, 'a') as outfile:
-        outfile.write("# \n")
-        outfile.write("# \n")
-        outfile.write("# Reference: '{}'\n".format(' '.join(args.REF)))
-        outfile.write(mdt.fh.indent(text=mdt.rti.ag_info_str(ag=ref),
-                                    amount=1,
-                                    char="#   ")
-                      + "\n")
-        outfile.write("# \n")
-        outfile.write("# Selection: '{}'\n".format(' '.join(args.SEL)))
-        outfile.write(mdt.fh.indent(text=mdt.rti.ag_info_str(ag=sel),
-                                    amount=1,
-                                    char="#   ")
-                      + "\n")
-        outfile.write("# \n")
-        outfile.write("# \n")
-        outfile.write("# Contact histograms\n")
-        outfile.write("# Cutoff (Angstrom): {}\n".format(args.CUTOFF))
-        outfile.write("# Statistics:\n")
-        outfile.write("#   Number of frames:                         {:>9d}\n".format(N_FRAMES))
-        outfile.write("#   Total number of ref atoms    (per frame): {:>9d}  ({:>9.2f})\n".format(n_refatm, n_refatm/N_FRAMES))
-        outfile.write("#   Total number of ref residues (per frame): {:>9d}  ({:>9.2f})\n".format(n_refres, n_refres/N_FRAMES))
-        outfile.write("#   Total number of sel atoms    (per frame): {:>9d}  ({:>9.2f})\n".format(n_selatm, n_selatm/N_FRAMES))
-        outfile.write("#   Total number of sel residues (per frame): {:>9d}  ({:>9.2f})\n".format(n_selres, n_selres/N_FRAMES))
-        outfile.write("# \n")
-        outfile.write("# \n")
-        outfile.write("# Percentage of ref atoms    connected to at least one sel atom:                    {:10.4e}\n".format(1-hist_atm[0][0]))
-        outfile.write("# Percentage of ref residues connected to at least one sel atom:                    {:10.4e}\n".format(1-hist_res[0][0]))
-        outfile.write("#    (2)  Average       sel atom    coordination number of all   ref atoms:         {:10.4e}  (Every ref atom                              has on average           contact  with this many           sel atoms)\n".format(av_atm[0]))
-        outfile.write("#    (2)* Average       sel atom    coordination number of bound ref atoms:         {:10.4e}  (Every ref atom    connected to sel atoms    has on average           contact  with this many           sel atoms)\n".format(av_atm_bound[0]))
-        outfile.write("#    (3)  Average       sel residue coordination number of all   ref atoms:         {:10.4e}  (Every ref atom                              has on average           contact  with this many different sel residues)\n".format(av_atm[1]))
-        outfile.write("#    (3)* Average       sel residue coordination number of bound ref atoms:         {:10.4e}  (Every ref atom    connected to sel residues has on average           contact  with this many different sel residues)\n".format(av_atm_bound[1]))
-        outfile.write("#    (5)  Average       sel atom    coordination number of all   ref residues:      {:10.4e}  (Every ref residue                           has on average           contact  with this many different sel atoms)\n".format(av_res[0]))
-        outfile.write("#    (5)* Average       sel atom    coordination number of bound ref residues:      {:10.4e}  (Every ref residue connected to sel atoms    has on average           contact  with this many different sel atoms)\n".format(av_res_bound[0]))
-        outfile.write("#    (7)  Average total sel atom    coordination number of all   ref residues:      {:10.4e}  (Every ref residue                           has on average this many contacts with                     sel atoms)\n".format(av_res[2]))
-        outfile.write("#    (7)* Average total sel atom    coordination number of bound ref residues:      {:10.4e}  (Every ref residue connected to sel atoms    has on average this many contacts with                     sel atoms)\n".format(av_res_bound[2]))
-        outfile.write("#    (8)  Average       sel residue coordination number of all   ref residues:      {:10.4e}  (Every ref residue                           has on average           contact  with this many different sel residues)\n".format(av_res[3]))
-        outfile.write("#    (8)* Average       sel residue coordination number of bound ref residues:      {:10.4e}  (Every ref residue connected to sel residues has on average           contact  with this many different sel residues)\n".format(av_res_bound[3]))
-        outfile.write("#   (10)' Average number of 'bonds' ref atoms    establish to the same sel residue: {:10.4e}  (Every ref atom                              has on average this many contacts with           the same  sel residue)\n".format(av_par[0]))
-        outfile.write("#   (10)  Average number of 'bonds' between ref-atom-   sel-residue pairs:          {:10.4e}  (Every ref atom    connected to sel residues has on average this many contacts with           the same  sel residue)\n".format(av_par_bound[0]))
-        outfile.write("#   (11)' Average number of 'bonds' ref residues establish to the same sel atom:    {:10.4e}  (Every ref residue                           has on average this many contacts with           the same  sel atom)\n".format(av_par[1]))
-        outfile.write("#   (11)  Average number of 'bonds' between ref-residue-sel-atom    pairs:          {:10.4e}  (Every ref residue connected to sel atoms    has on average this many contacts with           the same  sel atom)\n".format(av_par_bound[1]))
-        outfile.write("#   (12)' Average number of 'bonds' ref residues establish to the same sel residue: {:10.4e}  (Every ref residue                           has on average this many contacts with           the same  sel residue)\n".format(av_par[2]))
-        outfile.write("#   (12)  Average number of 'bonds' between ref-residue-sel-residue pairs:          {:10.4e}  (Every ref residue connected to sel residues has on average this many contacts with           the same  sel residue)\n".format(av_par_bound[2]))
-        outfile.write("# The average coordination numbers given here are the product sum over all histogram elements of column number (i) times their respective number of contacts N\n")
-        outfile.write("# *) Additionally divided    by the percentage of bound ref atoms/residues (-> Probabilities are renormalized to the number of bound ref atoms/residues)\n")
-        outfile.write("# ') Additionally multiplied by the percentage of bound ref atoms/residues (-> Probabilities are renormalized to the number of all   ref atoms/residues)\n")
-        outfile.write("# \n")
-        outfile.write("# \n")
-        outfile.write("# The columns contain:\n")
-        outfile.write("#    1 N:                  Number of contacts between the reference and selection\n")
-        outfile.write("#    2 refatm_selatm:      % of ref atoms    that have   contact  with N different sel atoms    (multiple contacts with the same sel atom    discounted) [refatm_diff_selatm]\n")
-        outfile.write("#                       [= % of ref atoms    that have N contacts with             sel atoms    (multiple contacts with the same sel atom       counted)  refatm_selatm_tot]\n")
-        outfile.write("#                       [= % of ref atoms    that have N contacts with             sel residues (multiple contacts with the same sel residue    counted)  refatm_selres_tot]\n")
-        outfile.write("#    3 refatm_diff_selres: % of ref atoms    that have   contact  with N different sel residues (multiple contacts with the same sel residue discounted)\n")
-        outfile.write("#    4 refatm_same_selres: % of ref atoms    that have N contacts with   the same  sel residue  (multiple contacts with the same sel residue    counted, multiple connections to different sel residues via the same number of contacts discounted)\n")
-        outfile.write("#    5 refres_diff_selatm: % of ref residues that have   contact  with N different sel atoms    (multiple contacts with the same sel atom    discounted)\n")
-        outfile.write("#    6 refres_same_selatm: % of ref residues that have N contacts with   the same  sel atom     (multiple contacts with the same sel atom       counted, multiple connections to different sel atoms    via the same number of contacts discounted)\n")
-        outfile.write("#    7 refres_selatm_tot:  % of ref residues that have N contacts with             sel atoms    (multiple contacts with the same sel atom       counted)\n")
-        outfile.write("#                       [= % of ref residues that have N contacts with             sel residues (multiple contacts with the same sel residue    counted)  refres_selres_tot]\n")
-        outfile.write("#    8 refres_diff_selres: % of ref residues that have   contact  with N different sel residues (multiple contacts with the same sel residue discounted)\n")
-        outfile.write("#    9 refres_same_selres: % of ref residues that have N contacts with   the same  sel residue  (multiple contacts with the same sel residue    counted, multiple connections to different sel residues via the same number of contacts discounted)\n")
-        outfile.write("#   10 refatm_selres_pair: % of ref-atom    sel-residue pairs connected via N 'bonds'         (first element is meaningless)\n")
-        outfile.write("#   11 refres_selatm_pair: % of ref-residue sel-atom    pairs connected via N 'bonds'         (first element is meaningless)\n")
-        outfile.write("#   12 refres_selres_pair: % of ref-residue sel-residue pairs connected via N 'bonds'         (first element is meaningless)\n")
-        outfile.write("# \n")
-        outfile.write('# Column number:\n')
-        outfile.write("# {:3d}   {:16d} {:16d} {:16d}   {:16d} {:16d} {:16d} {:16d} {:16d}   {:16d} {:16d} {:16d}\n"
-                      .format(1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12))
-        outfile.write("# {:>3s}   {:>16s} {:>16s} {:>16s}   {:>16s} {:>16s} {:>16s} {:>16s} {:>16s}   {:>16s} {:>16s} {:>16s}\n"
-                      .format("N",                 # 01
-                              "refatm_selatm",     # 02
-                              "refatm_d_selres",   # 03
-                              "refatm_s_selres",   # 04
-                              "refres_d_selatm",   # 05
-                              "refres_s_selatm",   # 06
-                              "refres_selatm_t",   # 07
-                              "refres_d_selres",   # 08
-                              "refres_s_selres",   # 09
-                              "refatm_selres_p",   # 10
-                              "refres_selatm_p",   # 11
-                              "refres_selres_p"))  # 12
-        for i in range(last_nonzero+1):
-            outfile.write("  {:3d}   {:16.9e} {:16.9e} {:16.9e}   {:16.9e} {:16.9e} {:16.9e} {:16.9e} {:16.9e}   {:16.9e} {:16.9e} {:16.9e}\n"
-                          .format(i,                # 01
-                                  hist_atm[0][i],   # 02
-                                  hist_atm[1][i],   # 03
-                                  hist_atm[2][i],   # 04
-                                  hist_res[0][i],   # 05
-                                  hist_res[1][i],   # 06
-                                  hist_res[2][i],   # 07
-                                  hist_res[3][i],   # 08
-                                  hist_res[4][i],   # 09
-                                  hist_par[0][i],   # 10
-                                  hist_par[1][i],   # 11
-                                  hist_par[2][i]))  # 12
-        outfile.write("\n")
-        outfile.write("\n")
-        outfile.write("# Sums\n")
-        outfile.write("  {:3d}   {:16.9e} {:16.9e} {:16.9e}   {:16.9e} {:16.9e} {:16.9e} {:16.9e} {:16.9e}   {:16.9e} {:16.9e} {:16.9e}\n"
-                      .format(np.sum(np.arange(last_nonzero+1)),  # 01
-                              np.sum(hist_atm[0]),                # 02
-                              np.sum(hist_atm[1]),                # 03
-                              np.sum(hist_atm[2]),                # 04
-                              np.sum(hist_res[0]),                # 05
-                              np.sum(hist_res[1]),                # 06
-                              np.sum(hist_res[2]),                # 07
-                              np.sum(hist_res[3]),                # 08
-                              np.sum(hist_res[4]),                # 09
-                              np.sum(hist_par[0]),                # 10
-                              np.sum(hist_par[1]),                # 11
-                              np.sum(hist_par[2])))               # 12
+        outfile.write("".join(report))
         outfile.flush()
+    del report
     print("Created {}".format(args.OUTFILE))
     print("Elapsed time:         {}".format(datetime.now()-timer))
     print("Current memory usage: {:.2f} MiB"
@@ -1251,95 +1774,102 @@ if __name__ == '__main__':
     print("Checking output for consistency...")
     timer = datetime.now()
     tol = 1e-4
+    # Scalars are compared with `not abs(x - 1) <= tol` instead of
+    # np.isclose, which has a large overhead for scalar input.  Unlike
+    # `abs(x - 1) > tol`, this also fails for NaN.
     for i in [0, 1]:  # refatm_selatm, refatm_diff_selres
-        if not np.isclose(np.sum(hist_atm[i]), 1, rtol=0, atol=tol):
+        if not abs(sums_atm[i] - 1) <= tol:
             raise ValueError("The sum over 'hist_atm[{}]' ({}) is not"
-                             " one".format(i, np.sum(hist_atm[i])))
+                             " one".format(i, sums_atm[i]))
     for i in [2]:  # refatm_same_selres
-        if np.sum(hist_atm[i]) < 1:
+        if sums_atm[i] < 1:
             raise ValueError("The sum over 'hist_atm[{}]' ({}) is less"
-                             " than one".format(i, np.sum(hist_atm[i])))
-        if np.any(hist_atm[i] > 1):
+                             " than one".format(i, sums_atm[i]))
+        if hist_atm[i].max() > 1:
             raise ValueError("At least one element of 'hist_atm[{}]' is"
                              " greater than one".format(i))
     for i in [0, 2, 3]:  # refres_diff_selatm, refres_selatm_tot, refres_diff_selres
-        if not np.isclose(np.sum(hist_res[i]), 1, rtol=0, atol=tol):
+        if not abs(sums_res[i] - 1) <= tol:
             raise ValueError("The sum over 'hist_res[{}]' ({}) is not"
-                             " one".format(i, np.sum(hist_res[i])))
+                             " one".format(i, sums_res[i]))
     for i in [1, 4]:  # refres_same_selatm, refres_same_selres
-        if np.sum(hist_res[i]) < 1:
+        if sums_res[i] < 1:
             raise ValueError("The sum over 'hist_res[{}]' ({}) is less"
-                             " than one".format(i, np.sum(hist_res[i])))
-        if np.any(hist_res[i]) > 1:
+                             " than one".format(i, sums_res[i]))
+        if hist_res[i].max() > 1:
             raise ValueError("At least one element of 'hist_res[{}]' is"
                              " greater than one".format(i))
-    for i, hist in enumerate(hist_par):
-        if not np.isclose(np.sum(hist), 1, rtol=0, atol=tol):
-            raise ValueError("The sum over 'hist_par[{}]' ({}) is not"
-                             " one".format(i, np.sum(hist)))
-    
-    for i in range(1, len(hist_atm)):
-        if hist_atm[i][0] != hist_atm[0][0]:
-            raise ValueError("The percentage of refatms having no"
-                             " contact with any selatm is not the same"
-                             " in 'hist_atm[{}][0]' ({}) and"
-                             " 'hist_atm[0][0]' ({})"
-                             .format(i, hist_atm[i][0], hist_atm[0][0]))
-    for i in range(1, len(hist_res)):
-        if hist_res[i][0] != hist_res[0][0]:
-            raise ValueError("The percentage of refres having no contact"
-                             " with any selatm is not the same in"
-                             " 'hist_res[{}][0]' ({}) and"
-                             " 'hist_res[0][0]' ({})"
-                             .format(i, hist_res[i][0], hist_res[0][0]))
-    for i in range(1, len(hist_par)):
-        if hist_par[i][0] != 0:
-            raise ValueError("The first element of 'hist_par[{}][0]'"
-                             " ({}) is not zero"
-                             .format(i, hist_par[i][0]))
+    not_one = ~np.isclose(sums_par, 1, rtol=0, atol=tol)
+    if np.any(not_one):
+        i = np.argmax(not_one)
+        raise ValueError("The sum over 'hist_par[{}]' ({}) is not"
+                         " one".format(i, sums_par[i]))
+    del not_one
+    
+    # The first elements of all histograms of a kind are compared at
+    # once.  If they differ, the first offending histogram is reported.
+    mismatch = np.flatnonzero(hist_atm[1:, 0] != hist_atm[0][0]) + 1
+    if len(mismatch) > 0:
+        i = mismatch[0]
+        raise ValueError("The percentage of refatms having no"
+                         " contact with any selatm is not the same"
+                         " in 'hist_atm[{}][0]' ({}) and"
+                         " 'hist_atm[0][0]' ({})"
+                         .format(i, hist_atm[i][0], hist_atm[0][0]))
+    mismatch = np.flatnonzero(hist_res[1:, 0] != hist_res[0][0]) + 1
+    if len(mismatch) > 0:
+        i = mismatch[0]
+        raise ValueError("The percentage of refres having no contact"
+                         " with any selatm is not the same in"
+                         " 'hist_res[{}][0]' ({}) and"
+                         " 'hist_res[0][0]' ({})"
+                         .format(i, hist_res[i][0], hist_res[0][0]))
+    mismatch = np.flatnonzero(hist_par[1:, 0] != 0) + 1
+    if len(mismatch) > 0:
+        i = mismatch[0]
+        raise ValueError("The first element of 'hist_par[{}][0]'"
+                         " ({}) is not zero"
+                         .format(i, hist_par[i][0]))
+    del mismatch
     
     if ref.n_residues > 0 and not args.UPDATING_REF:
-        _, natms_per_refres = np.unique(ref.resindices,
-                                        return_counts=True)
-        if np.all(natms_per_refres == 1):
+        if ref.n_residues == ref.n_atoms:
             # refres == refatm
-            if not np.allclose(hist_res[0], hist_atm[0],
-                               rtol=0, atol=tol, equal_nan=True):
-                # refres_diff_selatm != refatm_selatm
-                raise ValueError("refres = refatm, but 'hist_res[0]' !="
-                                 " 'hist_atm[0]'")
-            if not np.allclose(hist_res[2], hist_atm[0],
-                               rtol=0, atol=tol, equal_nan=True):
-                # refres_selatm_tot != refatm_selatm
-                raise ValueError("refres = refatm, but 'hist_res[2]' !="
-                                 " 'hist_atm[0]'")
+            # refres_diff_selatm == refatm_selatm
+            # refres_selatm_tot  == refatm_selatm
+            # refres_diff_selres == refatm_diff_selres
+            # refres_same_selres == refatm_same_selres
+            ix_res = [0, 2, 3, 4]
+            ix_atm = [0, 0, 1, 2]
+            not_close = ~np.all(np.isclose(hist_res[ix_res],
+                                           hist_atm[ix_atm],
+                                           rtol=0,
+                                           atol=tol,
+                                           equal_nan=True),
+                                axis=1)
+            if np.any(not_close):
+                i = np.argmax(not_close)
+                raise ValueError("refres = refatm, but 'hist_res[{}]' !="
+                                 " 'hist_atm[{}]'"
+                                 .format(ix_res[i], ix_atm[i]))
+            del ix_res, ix_atm, not_close
             if not np.allclose(hist_res[1][:2],           # refres_same_selatm
                                np.array([hist_atm[0][0],  # refatm_selatm
                                          1-hist_atm[0][0]]),
                                rtol=0, atol=tol):
                 raise ValueError("refres = refatm, but 'hist_res[1]' !="
                                  " [x, 1-x]")
-            if not np.isclose(np.sum(hist_res[1]), 1, rtol=0, atol=tol):  # refres_same_selatm
+            if not abs(sums_res[1] - 1) <= tol:  # refres_same_selatm
                 raise ValueError("refres = refatm, but the sum over"
                                  " 'hist_res[1]' ({}) is not one"
-                                 .format(np.sum(hist_res[1])))
-            if not np.allclose(hist_res[3], hist_atm[1],
-                               rtol=0, atol=tol, equal_nan=True):
-                # refres_diff_selres != refatm_diff_selres
-                raise ValueError("refres = refatm, but 'hist_res[3]' !="
-                                 " 'hist_atm[1]'")
-            if not np.allclose(hist_res[4], hist_atm[2],
-                               rtol=0, atol=tol, equal_nan=True):
-                # refres_same_selres != refatm_same_selres
-                raise ValueError("refres = refatm, but 'hist_res[4]' !="
-                                 " 'hist_atm[2]'")
-            if not np.isclose(hist_par[1][1], 1, rtol=0, atol=tol):  # refres_selatm_pair
+                                 .format(sums_res[1]))
+            if not abs(hist_par[1][1] - 1) <= tol:  # refres_selatm_pair
                 raise ValueError("refres = refatm, but 'hist_par[1]'"
                                  "  != [0, 1]")
-            if not np.isclose(np.sum(hist_par[1]), 1, rtol=0, atol=tol):  # refres_selatm_pair
+            if not abs(sums_par[1] - 1) <= tol:  # refres_selatm_pair
                 raise ValueError("refres = refatm, but the sum over"
                                  " 'hist_par[1]' ({}) is not one"
-                                 .format(np.sum(hist_par[1])))
+                                 .format(sums_par[1]))
             if not np.allclose(hist_par[2], hist_par[0],
                                rtol=0, atol=tol, equal_nan=True):
                 # refres_selres_pair != refatm_selres_pair
@@ -1347,9 +1877,7 @@ if __name__ == '__main__':
                                  " 'hist_par[0]'")
     
     if sel.n_residues > 0 and not args.UPDATING_SEL:
-        _, natms_per_selres = np.unique(sel.resindices,
-                                        return_counts=True)
-        if np.all(natms_per_selres == 1):
+        if sel.n_residues == sel.n_atoms:
             # selres == selatm
             if np.any(hist_atm[1] != hist_atm[0]):
                 # refatm_diff_selres != refatm_selatm
@@ -1362,84 +1890,81 @@ if __name__ == '__main__':
                                atol=tol):
                 raise ValueError("selres = selatm, but 'hist_atm[2]' !="
                                  " '[x, 1-x]'")
-            if not np.isclose(np.sum(hist_atm[2]), 1, rtol=0, atol=tol):  # refatm_same_selres
+            if not abs(sums_atm[2] - 1) <= tol:  # refatm_same_selres
                 raise ValueError("selres = selatm, but the sum over"
                                  " 'hist_atm[2]' ({}) is not one"
-                                 .format(np.sum(hist_atm[2])))
-            if np.any(hist_res[3] != hist_res[0]):
-                # refres_diff_selres != refres_diff_selatm
-                raise ValueError("selres = selatm, but 'hist_res[3]' !="
-                                 " 'hist_res[0]'")
-            if np.any(hist_res[4] != hist_res[1]):
-                # refres_same_selres != refres_same_selatm
-                raise ValueError("selres = selatm, but 'hist_res[4]' !="
-                                 " 'hist_res[1]'")
-            if not np.isclose(hist_par[0][1], 1, rtol=0, atol=tol):  # refatm_selres_pair
+                                 .format(sums_atm[2]))
+            # refres_diff_selres == refres_diff_selatm
+            # refres_same_selres == refres_same_selatm
+            not_equal = np.any(hist_res[[3, 4]] != hist_res[[0, 1]], axis=1)
+            if np.any(not_equal):
+                i = np.argmax(not_equal)
+                raise ValueError("selres = selatm, but 'hist_res[{}]' !="
+                                 " 'hist_res[{}]'".format(3+i, i))
+            del not_equal
+            if not abs(hist_par[0][1] - 1) <= tol:  # refatm_selres_pair
                 raise ValueError("selres = selatm, but 'hist_par[0]'"
                                  " != [0, 1]")
-            if not np.isclose(np.sum(hist_par[0]), 1, rtol=0, atol=tol):  # refatm_selres_pair
+            if not abs(sums_par[0] - 1) <= tol:  # refatm_selres_pair
                 raise ValueError("selres = selatm, but the sum over"
                                  " 'hist_par[0]' ({}) is not one"
-                                 .format(np.sum(hist_par[0])))
+                                 .format(sums_par[0]))
             if np.any(hist_par[2] != hist_par[1]):
                 # refres_selres_pair != refres_selatm_pair
                 raise ValueError("selres = selatm, but 'hist_par[2]' !="
                                  " 'hist_par[1]'")
     
-    if not np.isclose(av_atm[1]*av_par_bound[0], av_atm[0],
-                      rtol=0, atol=tol):
-        raise ValueError("The average selres coordination number of all"
-                         " refatms ({}) times the average number of"
-                         " 'bonds' between refatm-selres pairs ({})"
-                         " differs from the average selatm coordination"
-                         " number of all refatms ({})"
-                         .format(av_atm[1], av_par_bound[0], av_atm[0]))
-    if not np.isclose(av_atm_bound[1]*av_par_bound[0], av_atm_bound[0],
-                      rtol=0, atol=tol):
-        raise ValueError("The average selres coordination number of"
-                         " bound refatms ({}) times the average number"
-                         " of 'bonds' between refatm-selres pairs ({})"
-                         " differs from the average selatm coordination"
-                         " number of bound refatms ({})"
-                         .format(av_atm_bound[1],
-                                 av_par_bound[0],
-                                 av_atm_bound[0]))
-    if not np.isclose(av_res[0]*av_par_bound[1], av_res[2],
-                      rtol=0, atol=tol):
-        raise ValueError("The average selatm coordination number of all"
-                         " refres ({}) times the average number of"
-                         " 'bonds' between refres-selatm pairs ({})"
-                         " differs from the average total selatm"
-                         " coordination number of all refres ({})"
-                         .format(av_res[0], av_par_bound[1], av_res[2]))
-    if not np.isclose(av_res_bound[0]*av_par_bound[1], av_res_bound[2],
-                      rtol=0, atol=tol):
-        raise ValueError("The average selatm coordination number of"
-                         " bound refres ({}) times the average number"
-                         " of 'bonds' between refres-selatm pairs ({})"
-                         " differs from the average total selatm"
-                         " coordination number of bound refres ({})"
-                         .format(av_res_bound[0],
-                                 av_par_bound[1],
-                                 av_res_bound[2]))
-    if not np.isclose(av_res[3]*av_par_bound[2], av_res[2],
-                      rtol=0, atol=tol):
-        raise ValueError("The average selres coordination number of all"
-                         " refres ({}) times the average number of"
-                         " 'bonds' between refres-selres pairs ({})"
-                         " differs from the average total selatm"
-                         " coordination number of all refres ({})"
-                         .format(av_res[3], av_par_bound[2], av_res[2]))
-    if not np.isclose(av_res_bound[3]*av_par_bound[2], av_res_bound[2],
-                      rtol=0, atol=tol):
-        raise ValueError("The average selres coordination number of"
-                         " bound refres ({}) times the average number"
-                         " of 'bonds' between refres-selres pairs ({})"
-                         " differs from the average total selatm"
-                         " coordination number of bound refres ({})"
-                         .format(av_res_bound[3],
-                                 av_par_bound[2],
-                                 av_res_bound[2]))
+    # The average coordination numbers of compounds multiplied by the
+    # average number of 'bonds' per pair must give the respective total
+    # coordination numbers: factor1 * factor2 == product.  All six
+    # relations are checked at once.
+    factor1 = np.array([av_atm[1],
+                        av_atm_bound[1],
+                        av_res[0],
+                        av_res_bound[0],
+                        av_res[3],
+                        av_res_bound[3]])
+    factor2 = av_par_bound[[0, 0, 1, 1, 2, 2]]
+    product = np.array([av_atm[0],
+                        av_atm_bound[0],
+                        av_res[2],
+                        av_res_bound[2],
+                        av_res[2],
+                        av_res_bound[2]])
+    # Negated comparison, so that NaN fails the check.
+    not_close = ~(np.abs(factor1*factor2 - product) <= tol)
+    if np.any(not_close):
+        messages = (
+            "The average selres coordination number of all refatms ({})"
+            " times the average number of 'bonds' between refatm-selres"
+            " pairs ({}) differs from the average selatm coordination"
+            " number of all refatms ({})",
+            "The average selres coordination number of bound refatms"
+            " ({}) times the average number of 'bonds' between"
+            " refatm-selres pairs ({}) differs from the average selatm"
+            " coordination number of bound refatms ({})",
+            "The average selatm coordination number of all refres ({})"
+            " times the average number of 'bonds' between refres-selatm"
+            " pairs ({}) differs from the average total selatm"
+            " coordination number of all refres ({})",
+            "The average selatm coordination number of bound refres ({})"
+            " times the average number of 'bonds' between refres-selatm"
+            " pairs ({}) differs from the average total selatm"
+            " coordination number of bound refres ({})",
+            "The average selres coordination number of all refres ({})"
+            " times the average number of 'bonds' between refres-selres"
+            " pairs ({}) differs from the average total selatm"
+            " coordination number of all refres ({})",
+            "The average selres coordination number of bound refres ({})"
+            " times the average number of 'bonds' between refres-selres"
+            " pairs ({}) differs from the average total selatm"
+            " coordination number of bound refres ({})"
+        )
+        i = np.argmax(not_close)
+        raise ValueError(messages[i].format(factor1[i],
+                                            factor2[i],
+                                            product[i]))
+    del factor1, factor2, product, not_close
     print("Elapsed time:         {}".format(datetime.now()-timer))
     print("Current memory usage: {:.2f} MiB"
           .format(proc.memory_info().rss/2**20))
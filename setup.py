@@ -133,7 +133,7 @@ if __name__ == '__main__':
         python_requires=">=3.6, <4.0",
         install_requires=["psutil >=5.7, <6.0",
                           "numpy >=1.18, <2.0",
-                          "scipy >=1.5, <2.0",
+                          "scipy >=1.6, <2.0",
                           "matplotlib >=3.2, <3.3",
                           "MDAnalysis >=1.0, <2.0",
                           "pyemma >=2.5, <3.0"]